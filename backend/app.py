@@ -5,15 +5,33 @@ Provides endpoints for sentiment prediction on restaurant reviews.
 Uses trained Linear SVM model with TF-IDF vectorization and probability calibration.
 """
 
-from flask import Flask, request, jsonify
+import time
+_import_started = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pickle
 import os
+import hmac
 import json
-from preprocess import preprocess_text
+import threading
+import preprocess
+import inference
+from preprocess import preprocess_text, lemma_cache, warm_up as warm_up_preprocessing
+from cache import LRUCache
+from inference import predict_batch, score_processed, score_and_explain, format_prediction, DEFAULT_CHUNK_SIZE
+from explain import DEFAULT_TOP_K, MAX_TOP_K
+from metrics import MetricsRegistry, SIZE_BUCKETS, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from scorer import CompiledLinearScorer
+from artifacts import is_artifact_dir
+from batching import MicroBatcher, QueueFullError
+from registry import ModelRegistry, load_pickled_bundle, load_mapped_bundle
+from responses import FastJSONProvider, negotiate_encoding, compress_body
 
-# Initialize Flask app
+# Initialize Flask app; jsonify uses orjson when it is installed. Responses are
+# UTF-8 rather than ASCII with \u escapes, which orjson requires (see responses.py)
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
+app.json.ensure_ascii = False
 
 # Configure CORS with explicit settings
 CORS(app, 
@@ -35,40 +53,444 @@ def after_request(response):
 MODEL_PATH = 'sentiment_model.pkl'
 VECTORIZER_PATH = 'vectorizer.pkl'
 
-# Global variables to store model and vectorizer
-model = None
-vectorizer = None
+# Memory-mapped artifact directory (see artifacts.py); preferred over the pickles when present
+ARTIFACT_DIR = os.environ.get('ARTIFACT_DIR', 'model_artifact')
 
+# Registry of versioned model directories (see registry.py); when it has an
+# ACTIVE version, that version is served instead of the paths above
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', 'models')
+registry = ModelRegistry(MODEL_REGISTRY_DIR)
 
-def load_model_and_vectorizer():
+# Seconds between checks of the registry's ACTIVE pointer (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+
+# Watcher interval serve.py uses when it forks several workers and none is configured,
+# so that a reload received by one worker reaches all of them
+FORKED_WATCH_INTERVAL = 2.0
+
+# Token required by /admin endpoints; without it they are disabled
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Number of reviews scored per vectorized call in /batch_predict
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+
+# Number of lines scored per vectorized call in /stream_predict
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 256))
+
+# Longest accepted /stream_predict input line; longer lines are skipped with an error record
+STREAM_MAX_LINE_BYTES = int(os.environ.get('STREAM_MAX_LINE_BYTES', 1024 * 1024))
+
+# Responses of at least COMPRESS_MIN_BYTES are gzip/deflate compressed for clients
+# that send a matching Accept-Encoding header (COMPRESS_LEVEL 0 disables it)
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 1))
+
+# Active model bundle (model, vectorizer, compiled scorer and version).
+# Replaced as a whole on reload; requests read it once and keep using that
+# bundle, so in-flight requests finish on the version they started with.
+active_bundle = None
+
+# Optional review -> prediction cache in front of /predict (0 disables it),
+# keyed on the review with case and whitespace normalized (see prediction_cache_key)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 0))
+prediction_cache = LRUCache(PREDICTION_CACHE_SIZE)
+
+# Optional dynamic micro-batching of concurrent /predict calls (see batching.py)
+MICROBATCH_ENABLED = os.environ.get('MICROBATCH_ENABLED', '0').lower() in ('1', 'true', 'yes')
+MICROBATCH_MAX_SIZE = int(os.environ.get('MICROBATCH_MAX_SIZE', 32))
+MICROBATCH_MAX_WAIT_US = int(os.environ.get('MICROBATCH_MAX_WAIT_US', 2000))
+MICROBATCH_MAX_QUEUE = int(os.environ.get('MICROBATCH_MAX_QUEUE', 1024))
+
+WARMUP_REVIEW = 'The food was great but the service was slow.'
+
+# Load the model and warm up in a background thread, so a new process answers
+# /health right away and serves predictions as soon as the model is in
+BACKGROUND_WARMUP = os.environ.get('BACKGROUND_WARMUP', '0').lower() in ('1', 'true', 'yes')
+
+# Also import NLTK's tokenizer during warm-up; otherwise the first non-ASCII review does
+WARMUP_TOKENIZER = os.environ.get('WARMUP_TOKENIZER', '0').lower() in ('1', 'true', 'yes')
+
+# Measured startup timings, reported by /health
+startup = {
+    'state': 'idle',
+    'background': False,
+    'import_seconds': None,
+    'model_load_seconds': None,
+    'warmup_seconds': None,
+    'ready_seconds': None,
+    'first_request_seconds': None,
+    'lemmatizer': None
+}
+PREDICTION_ENDPOINTS = ('predict', 'batch_predict', 'stream_predict')
+
+# Prometheus-style metrics served on /metrics (see metrics.py); 0 turns all
+# instrumentation off, including the preprocessing and scoring stage timers
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+metrics = MetricsRegistry()
+REQUEST_COUNT = metrics.counter('restro_http_requests_total', 'HTTP requests by endpoint, method and status',
+                                ('endpoint', 'method', 'status'))
+REQUEST_ERRORS = metrics.counter('restro_http_request_errors_total', 'HTTP requests answered with an error status',
+                                 ('endpoint', 'status'))
+REQUEST_LATENCY = metrics.histogram('restro_http_request_duration_seconds',
+                                    'Time until the response is returned (streamed bodies excluded)', ('endpoint',))
+STAGE_LATENCY = metrics.histogram('restro_stage_duration_seconds',
+                                  'Latency of prediction pipeline stages', ('stage',))
+BATCH_SIZE = metrics.histogram('restro_batch_size', 'Reviews per scoring batch', ('endpoint',),
+                               buckets=SIZE_BUCKETS)
+MODEL_LOAD_SECONDS = metrics.gauge('restro_model_load_seconds', 'Time taken to load the active model', ('version',))
+MICROBATCH_FLUSHES = metrics.counter('restro_microbatch_flushes_total',
+                                     'Micro-batches scored, by what flushed them (full or timeout)', ('reason',))
+MICROBATCH_ITEMS = metrics.counter('restro_microbatch_items_total', 'Reviews scored through micro-batches')
+MICROBATCH_REJECTED = metrics.counter('restro_microbatch_rejected_total',
+                                      'Predictions rejected because the micro-batching queue was full')
+MICROBATCH_QUEUE_DEPTH = metrics.gauge('restro_microbatch_queue_depth', 'Reviews waiting for a micro-batch',
+                                       merge='sum')
+MICROBATCH_LARGEST = metrics.gauge('restro_microbatch_largest_batch', 'Largest micro-batch scored')
+
+# Seconds between writes of a worker's metrics when serve.py shares them across workers
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1))
+
+
+def record_stage(stage, seconds):
+    """Record the latency of one pipeline stage."""
+    STAGE_LATENCY.observe(seconds, stage=stage)
+
+
+def observe_stage(stage, start):
+    """Record the time since start (a perf_counter value) for a stage, if metrics are enabled."""
+    if METRICS_ENABLED:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+
+
+if METRICS_ENABLED:
+    preprocess.set_stage_observer(record_stage)
+    inference.set_stage_observer(record_stage)
+
+
+def score_microbatch(items):
     """
-    Load trained model and vectorizer from pickle files.
+    Score a micro-batch of preprocessed reviews with one vectorized call per model.
     
+    Args:
+        items (list): (bundle, processed_review) pairs; reviews queued
+            before a model swap are still scored with their own bundle
+        
     Returns:
-        tuple: (model, vectorizer) or (None, None) if files not found
+        list: format_prediction dict for each item
     """
-    global model, vectorizer
+    results = [None] * len(items)
+    if METRICS_ENABLED:
+        BATCH_SIZE.observe(len(items), endpoint='predict')
+    groups = {}
+    for i, (bundle, _) in enumerate(items):
+        groups.setdefault(id(bundle), (bundle, []))[1].append(i)
+    for bundle, indices in groups.values():
+        labels, probabilities = score_processed(bundle.scorer, bundle.vectorizer, [items[i][1] for i in indices])
+        for i, label, proba in zip(indices, labels, probabilities):
+            results[i] = format_prediction(label, proba)
+    return results
+
+
+micro_batcher = MicroBatcher(score_microbatch, max_batch_size=MICROBATCH_MAX_SIZE,
+                             max_wait_us=MICROBATCH_MAX_WAIT_US,
+                             max_queue_depth=MICROBATCH_MAX_QUEUE) if MICROBATCH_ENABLED else None
+
+
+if METRICS_ENABLED and micro_batcher is not None:
+    @metrics.collector
+    def collect_microbatch_metrics():
+        """Copy the micro-batcher's counters into /metrics."""
+        stats = micro_batcher.stats()
+        MICROBATCH_FLUSHES.set_total(stats['flushed_full'], reason='full')
+        MICROBATCH_FLUSHES.set_total(stats['flushed_timeout'], reason='timeout')
+        MICROBATCH_ITEMS.set_total(stats['items'])
+        MICROBATCH_REJECTED.set_total(stats['rejected'])
+        MICROBATCH_QUEUE_DEPTH.set(stats['queue_depth'])
+        MICROBATCH_LARGEST.set(stats['largest_batch'])
+
+
+def share_metrics(directory):
+    """
+    Report metrics summed over pre-forked workers (see MetricsRegistry.share).
     
-    if not os.path.exists(MODEL_PATH) or not os.path.exists(VECTORIZER_PATH):
-        print(f"Warning: Model files not found.")
-        print(f"  Expected: {MODEL_PATH}")
-        print(f"  Expected: {VECTORIZER_PATH}")
-        print("Please run train_model.py first to train the model.")
-        return None, None
+    Args:
+        directory (str): Directory shared by the workers
+    """
+    if METRICS_ENABLED:
+        metrics.share(directory)
+
+
+def start_worker_metrics():
+    """Start writing this worker's metrics to the shared directory, if any."""
+    if METRICS_ENABLED:
+        metrics.start_flusher(METRICS_FLUSH_INTERVAL)
+
+
+def prediction_cache_key(bundle, review_text):
+    """
+    Build the prediction cache key of a review.
     
-    try:
-        with open(MODEL_PATH, 'rb') as f:
-            model = pickle.load(f)
-        print(f"Model loaded from {MODEL_PATH}")
+    Preprocessing lowercases reviews and splits them on whitespace, so
+    reviews differing only in case or spacing share one entry. HTML tags
+    and URLs are removed before lowercasing, and a tag cannot span a line
+    break, so reviews that may contain either are keyed on their exact text.
+    
+    Args:
+        bundle: Model bundle serving the request
+        review_text (str): Raw review
         
-        with open(VECTORIZER_PATH, 'rb') as f:
-            vectorizer = pickle.load(f)
-        print(f"Vectorizer loaded from {VECTORIZER_PATH}")
+    Returns:
+        tuple: (model version, normalized review)
+    """
+    lowered = review_text.lower()
+    if '<' in review_text or 'http' in lowered or 'www.' in lowered:
+        return bundle.version, review_text
+    return bundle.version, ' '.join(lowered.split())
+
+
+def parse_explain(data):
+    """
+    Read the optional "explain" field of a prediction request.
+    
+    Args:
+        data (dict): Request JSON
+        
+    Returns:
+        int: N-grams to report per direction, 0 for no explanation
         
-        return model, vectorizer
+    Raises:
+        ValueError: If the field is not a boolean or a count from 1 to MAX_TOP_K
+    """
+    value = data.get('explain', False)
+    if value is True:
+        return DEFAULT_TOP_K
+    if value is False or value is None:
+        return 0
+    if isinstance(value, int) and 0 < value <= MAX_TOP_K:
+        return value
+    raise ValueError(f'"explain" must be true, false or a number of n-grams from 1 to {MAX_TOP_K}')
+
+
+def explanations_unavailable():
+    """Error response for explanation requests the active model cannot serve."""
+    return jsonify({
+        'error': 'Explanations unavailable',
+        'message': 'The active model is not linear, so predictions cannot be explained'
+    }), 501
+
+
+def install_bundle(bundle):
+    """
+    Make a bundle the one served to new requests.
+    
+    A single reference assignment, so the swap is atomic.
+    
+    Args:
+        bundle (ModelBundle): Loaded, warmed-up bundle
+    """
+    global active_bundle
+    active_bundle = bundle
+    if METRICS_ENABLED:
+        MODEL_LOAD_SECONDS.clear()
+        MODEL_LOAD_SECONDS.set(bundle.load_seconds, version=bundle.version)
+
+
+def load_model_and_vectorizer():
+    """
+    Load trained model and vectorizer and make them the active bundle.
+    
+    Sources, in order of preference: the ACTIVE version of the model
+    registry, the memory-mapped artifact in ARTIFACT_DIR, then the pickle
+    files. Pickled models are also compiled into a single linear scorer
+    (see scorer.py).
+    
+    Returns:
+        tuple: (model, vectorizer) or (None, None) if files not found
+    """
+    try:
+        if registry.active_version() is not None:
+            bundle = registry.load()
+            print(f"Model version {bundle.version} loaded from registry {MODEL_REGISTRY_DIR}")
+        elif is_artifact_dir(ARTIFACT_DIR):
+            bundle = load_mapped_bundle(ARTIFACT_DIR)
+            print(f"Mapped artifact loaded from {ARTIFACT_DIR}")
+        elif os.path.exists(MODEL_PATH) and os.path.exists(VECTORIZER_PATH):
+            bundle = load_pickled_bundle(MODEL_PATH, VECTORIZER_PATH)
+            print(f"Model loaded from {MODEL_PATH}")
+            print(f"Vectorizer loaded from {VECTORIZER_PATH}")
+        else:
+            print(f"Warning: Model files not found.")
+            print(f"  Expected: {MODEL_PATH}")
+            print(f"  Expected: {VECTORIZER_PATH}")
+            print("Please run train_model.py first to train the model.")
+            return None, None
     except Exception as e:
         print(f"Error loading model: {str(e)}")
         return None, None
+    
+    print(f"Model version: {bundle.version}")
+    if isinstance(bundle.scorer, CompiledLinearScorer):
+        print(f"Model compiled into a linear scorer ({bundle.scorer.n_folds} folds)")
+    else:
+        print("Model could not be compiled; scoring with the original model")
+    
+    install_bundle(bundle)
+    return bundle.model, bundle.vectorizer
+
+
+# State of the most recent model reload, reported by /health and /admin/models
+reload_lock = threading.Lock()
+reload_status = {'state': 'idle', 'version': None, 'error': None, 'started_at': None, 'finished_at': None}
+
+
+def reload_model(version=None, activate=True):
+    """
+    Load a registry version, warm it up and atomically swap it in.
+    
+    Requests already running keep the bundle they started with. Rolling
+    back is the same operation with an older version.
+    
+    Args:
+        version (str): Version to load (defaults to the newest version)
+        activate (bool): Also point the registry's ACTIVE file at it, so
+            other worker processes pick it up through the watcher
+        
+    Returns:
+        ModelBundle: The newly active bundle
+    """
+    with reload_lock:
+        version = version or (registry.versions() or [None])[-1]
+        reload_status.update(state='loading', version=version, error=None,
+                             started_at=time.time(), finished_at=None)
+        try:
+            bundle = registry.load(version)
+            predict_batch(bundle.scorer, bundle.vectorizer, [WARMUP_REVIEW])
+            if activate and registry.active_version() != bundle.version:
+                registry.set_active(bundle.version)
+            install_bundle(bundle)
+        except Exception as e:
+            reload_status.update(state='failed', error=str(e), finished_at=time.time())
+            raise
+        reload_status.update(state='idle', finished_at=time.time())
+        print(f"Model version {bundle.version} is now active")
+        return bundle
+
+
+def watch_registry():
+    """Reload whenever the registry's ACTIVE pointer names another version."""
+    while True:
+        time.sleep(MODEL_WATCH_INTERVAL)
+        try:
+            version = registry.active_version()
+            if version is not None and (active_bundle is None or active_bundle.version != version):
+                reload_model(version, activate=False)
+        except Exception as e:
+            print(f"Model watcher: reload failed: {str(e)}")
+
+
+watcher_pid = None
+
+
+def enable_model_watcher(interval=FORKED_WATCH_INTERVAL):
+    """
+    Turn the registry watcher on if MODEL_WATCH_INTERVAL leaves it off.
+    
+    Args:
+        interval (float): Seconds between checks of the ACTIVE pointer
+    """
+    global MODEL_WATCH_INTERVAL
+    if MODEL_WATCH_INTERVAL <= 0:
+        MODEL_WATCH_INTERVAL = interval
+
+
+@app.before_request
+def ensure_model_watcher():
+    """Start the registry watcher thread once per (forked) worker process."""
+    global watcher_pid
+    if MODEL_WATCH_INTERVAL > 0 and watcher_pid != os.getpid():
+        watcher_pid = os.getpid()
+        threading.Thread(target=watch_registry, name='model-watcher', daemon=True).start()
+
+
+def start_request_timer():
+    """Remember when the request started, for latency metrics."""
+    g.request_start = time.perf_counter()
+
+
+def record_first_request(response):
+    """Record the latency of the first prediction request this process serves."""
+    if startup['first_request_seconds'] is None and request.endpoint in PREDICTION_ENDPOINTS:
+        startup['first_request_seconds'] = round(time.perf_counter() - g.request_start, 4)
+    return response
+
+
+def record_request_metrics(response):
+    """Count the request and record its latency by matched route."""
+    start = g.get('request_start')
+    # Label by route pattern rather than raw path to keep label sets bounded
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    status = str(response.status_code)
+    REQUEST_COUNT.inc(endpoint=endpoint, method=request.method, status=status)
+    if response.status_code >= 400:
+        REQUEST_ERRORS.inc(endpoint=endpoint, status=status)
+    if start is not None:
+        REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+    return response
+
+
+app.before_request(start_request_timer)
+app.after_request(record_first_request)
+if METRICS_ENABLED:
+    app.after_request(record_request_metrics)
+
+
+@app.after_request
+def compress_response(response):
+    """
+    Compress the response body when the client accepts gzip or deflate.
+    
+    Registered after the metrics hooks, so it runs before them (Flask runs
+    after_request functions in reverse) and request latency includes it.
+    Streamed responses, bodies under COMPRESS_MIN_BYTES and responses that
+    already have a Content-Encoding are sent unchanged.
+    
+    Args:
+        response: Outgoing response
+        
+    Returns:
+        Response: The response, compressed if negotiated
+    """
+    if COMPRESS_LEVEL <= 0 or response.is_streamed or response.direct_passthrough \
+            or 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None or response.content_length is None or response.content_length < COMPRESS_MIN_BYTES:
+        return response
+    start = time.perf_counter()
+    response.set_data(compress_body(response.get_data(), encoding, COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    observe_stage('compress', start)
+    return response
+
+
+def admin_denied():
+    """
+    Check access to /admin endpoints.
+    
+    The source address is not trusted (behind a local reverse proxy every
+    client is localhost), so without ADMIN_TOKEN the endpoints are off.
+    
+    Returns:
+        tuple: 403 JSON response unless the request's bearer token matches
+        ADMIN_TOKEN, else None
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Forbidden', 'message': 'Admin endpoints are disabled; set ADMIN_TOKEN'}), 403
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {ADMIN_TOKEN}'.encode('utf-8')):
+        return jsonify({'error': 'Forbidden', 'message': 'Admin access required'}), 403
+    return None
 
 
 @app.route('/', methods=['GET'])
@@ -85,7 +507,12 @@ def home():
         'status': 'Running',
         'endpoints': {
             'POST /predict': 'Predict sentiment for a review',
-            'GET /health': 'Health check'
+            'POST /batch_predict': 'Predict sentiment for a list of reviews',
+            'POST /stream_predict': 'Stream NDJSON predictions for NDJSON or plain text lines',
+            'GET /health': 'Health check',
+            'GET /metrics': 'Prometheus metrics',
+            'GET /admin/models': 'List registry versions and reload status',
+            'POST /admin/reload': 'Load and activate a registry version (also used for rollback)'
         }
     })
 
@@ -95,14 +522,33 @@ def health_check():
     """
     Health check endpoint.
     
+    Also reports the active model bundle, startup timings (import, model
+    load, warm-up, first request), the hit, miss and eviction counters of
+    the lemma and prediction caches, and micro-batching metrics (batch
+    sizes, queue depth) when it is enabled.
+    
     Returns:
         JSON: Health status
     """
-    model_loaded = model is not None and vectorizer is not None
+    bundle = active_bundle
+    model_loaded = bundle is not None
+    if model_loaded:
+        status = 'healthy'
+    else:
+        status = 'starting' if startup['state'] == 'starting' else 'unhealthy'
     return jsonify({
-        'status': 'healthy' if model_loaded else 'unhealthy',
+        'status': status,
         'model_loaded': model_loaded,
-        'message': 'Model is ready for predictions' if model_loaded else 'Model not loaded. Please train first.'
+        'model_version': bundle.version if model_loaded else None,
+        'model': bundle.describe() if model_loaded else None,
+        'reload': reload_status,
+        'startup': startup,
+        'message': 'Model is ready for predictions' if model_loaded else 'Model not loaded. Please train first.',
+        'caches': {
+            'lemma': lemma_cache.stats(),
+            'prediction': prediction_cache.stats()
+        },
+        'microbatching': micro_batcher.stats() if micro_batcher is not None else {'enabled': False}
     })
 
 
@@ -113,9 +559,15 @@ def predict():
     
     Expected JSON input:
     {
-        "review": "review text here"
+        "review": "review text here",
+        "explain": true or number of n-grams (optional)
     }
     
+    With "explain", the response also has an "explanation" with the
+    n-grams that pushed the prediction most towards positive and negative,
+    and their contributions to the calibrated log-odds. Explained requests
+    bypass the prediction cache and micro-batching.
+    
     Returns:
         JSON: {
             "review": "processed review",
@@ -124,8 +576,10 @@ def predict():
             "raw_prediction": 0 or 1
         }
     """
-    # Check if model is loaded
-    if model is None or vectorizer is None:
+    # Check if model is loaded; the bundle is read once so a concurrent
+    # reload cannot mix versions within this request
+    bundle = active_bundle
+    if bundle is None:
         return jsonify({
             'error': 'Model not loaded',
             'message': 'Please train the model first using train_model.py'
@@ -138,7 +592,9 @@ def predict():
             'message': 'Request must be JSON with "review" field'
         }), 400
     
+    start = time.perf_counter()
     data = request.get_json()
+    observe_stage('parse_json', start)
     
     # Validate input
     if 'review' not in data or not isinstance(data['review'], str):
@@ -156,34 +612,60 @@ def predict():
         }), 400
     
     try:
-        # Preprocess the review
-        processed_review = preprocess_text(review_text)
-        
-        # Vectorize the review
-        review_vectorized = vectorizer.transform([processed_review])
+        top_k = parse_explain(data)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Invalid input',
+            'message': str(e)
+        }), 400
+    if top_k and not bundle.explainer.available:
+        return explanations_unavailable()
+    
+    try:
+        if top_k:
+            start = time.perf_counter()
+            processed_review = preprocess_text(review_text)
+            observe_stage('preprocess', start)
+            labels, probabilities, explanations = score_and_explain(
+                bundle.scorer, bundle.vectorizer, [processed_review], bundle.explainer, top_k)
+            return jsonify({
+                'original_review': review_text,
+                'processed_review': processed_review,
+                **format_prediction(labels[0], probabilities[0]),
+                'explanation': explanations[0]
+            }), 200
         
-        # Make prediction
-        prediction = model.predict(review_vectorized)[0]
+        # Serve repeats of a review (up to case and spacing) from the prediction cache
+        cache_key = prediction_cache_key(bundle, review_text)
+        cached = prediction_cache.get(cache_key) if prediction_cache.enabled else None
+        if cached is not None:
+            return jsonify({'original_review': review_text, **cached}), 200
         
-        # Get prediction probability
-        probabilities = model.predict_proba(review_vectorized)[0]
-        confidence = float(max(probabilities))
+        # Preprocess the review
+        start = time.perf_counter()
+        processed_review = preprocess_text(review_text)
+        observe_stage('preprocess', start)
         
-        # Convert to sentiment label
-        sentiment = 'Positive' if prediction == 1 else 'Negative'
+        # Vectorize and score the review in a single pass, batched with
+        # concurrent requests when micro-batching is enabled
+        if micro_batcher is not None:
+            scored = micro_batcher.submit((bundle, processed_review))
+        else:
+            scored = score_microbatch([(bundle, processed_review)])[0]
+        prediction = {'processed_review': processed_review, **scored}
+        prediction_cache.put(cache_key, prediction)
         
         return jsonify({
             'original_review': review_text,
-            'processed_review': processed_review,
-            'sentiment': sentiment,
-            'confidence': round(confidence, 4),
-            'raw_prediction': int(prediction),
-            'probabilities': {
-                'negative': round(float(probabilities[0]), 4),
-                'positive': round(float(probabilities[1]), 4)
-            }
+            **prediction
         }), 200
     
+    except QueueFullError as e:
+        return jsonify({
+            'error': 'Server busy',
+            'message': str(e)
+        }), 503
+    
     except Exception as e:
         return jsonify({
             'error': 'Prediction error',
@@ -198,14 +680,29 @@ def batch_predict():
     
     Expected JSON input:
     {
-        "reviews": ["review1", "review2", ...]
+        "reviews": ["review1", "review2", ...],
+        "explain": true or number of n-grams (optional),
+        "echo": false to leave "original_review" out of the results (optional)
     }
     
+    With "explain", every prediction gets an "explanation" as in /predict,
+    computed for each chunk from the matrix it was scored with. Repeated
+    reviews, and reviews that preprocess to the same text, are scored once.
+    
+    Reviews are scored with one vectorized call per chunk of
+    BATCH_CHUNK_SIZE reviews. Results are returned in input order; items
+    that are not non-empty strings get an entry with "skipped": true.
+    
     Returns:
-        JSON: Array of predictions
+        JSON: {
+            "count": number of scored reviews,
+            "skipped": number of skipped items,
+            "predictions": one entry per input item, each with its "index"
+        }
     """
     # Check if model is loaded
-    if model is None or vectorizer is None:
+    bundle = active_bundle
+    if bundle is None:
         return jsonify({
             'error': 'Model not loaded',
             'message': 'Please train the model first'
@@ -218,7 +715,9 @@ def batch_predict():
             'message': 'Request must be JSON with "reviews" field'
         }), 400
     
+    start = time.perf_counter()
     data = request.get_json()
+    observe_stage('parse_json', start)
     
     # Validate input
     if 'reviews' not in data or not isinstance(data['reviews'], list):
@@ -236,31 +735,33 @@ def batch_predict():
         }), 400
     
     try:
-        predictions = []
-        
-        for review_text in reviews:
-            if not isinstance(review_text, str) or len(review_text.strip()) == 0:
-                continue
-            
-            # Preprocess the review
-            processed_review = preprocess_text(review_text)
-            
-            # Vectorize and predict
-            review_vectorized = vectorizer.transform([processed_review])
-            prediction = model.predict(review_vectorized)[0]
-            probabilities = model.predict_proba(review_vectorized)[0]
-            confidence = float(max(probabilities))
-            sentiment = 'Positive' if prediction == 1 else 'Negative'
-            
-            predictions.append({
-                'original_review': review_text,
-                'sentiment': sentiment,
-                'confidence': round(confidence, 4),
-                'raw_prediction': int(prediction)
-            })
+        top_k = parse_explain(data)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Invalid input',
+            'message': str(e)
+        }), 400
+    if top_k and not bundle.explainer.available:
+        return explanations_unavailable()
+    
+    echo = data.get('echo', True)
+    if not isinstance(echo, bool):
+        return jsonify({
+            'error': 'Invalid input',
+            'message': '"echo" must be true or false'
+        }), 400
+    
+    if METRICS_ENABLED:
+        BATCH_SIZE.observe(len(reviews), endpoint='batch_predict')
+    
+    try:
+        predictions = predict_batch(bundle.scorer, bundle.vectorizer, reviews, chunk_size=BATCH_CHUNK_SIZE,
+                                    explainer=bundle.explainer if top_k else None, top_k=top_k, echo=echo)
+        scored = sum(1 for p in predictions if not p.get('skipped'))
         
         return jsonify({
-            'count': len(predictions),
+            'count': scored,
+            'skipped': len(predictions) - scored,
             'predictions': predictions
         }), 200
     
@@ -271,6 +772,247 @@ def batch_predict():
         }), 500
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Expose request counters, stage latencies, batch sizes and model load
+    time in the Prometheus text format.
+    
+    Stage latencies cover request JSON parsing, preprocessing and its
+    sub-steps (html_strip, tokenize, lemmatize), vectorize and score.
+    With micro-batching on, its flushes, items, rejections, queue depth
+    and largest batch are included. Behind serve.py with several workers,
+    values are combined over all workers, whichever worker answers.
+    
+    Returns:
+        text/plain: Metrics exposition, or 404 when METRICS_ENABLED is off
+    """
+    if not METRICS_ENABLED:
+        return jsonify({
+            'error': 'Not found',
+            'message': 'Metrics are disabled (METRICS_ENABLED=0)'
+        }), 404
+    return Response(metrics.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
+
+@app.route('/admin/models', methods=['GET'])
+def admin_models():
+    """
+    List the model registry and the version this process serves.
+    
+    Returns:
+        JSON: Served bundle, registry versions, ACTIVE pointer and reload status
+    """
+    denied = admin_denied()
+    if denied:
+        return denied
+    bundle = active_bundle
+    return jsonify({
+        'serving': bundle.describe() if bundle is not None else None,
+        'registry': os.path.abspath(MODEL_REGISTRY_DIR),
+        'versions': registry.versions(),
+        'active': registry.active_version(),
+        'reload': reload_status
+    })
+
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """
+    Load a registry version and atomically swap it in.
+    
+    Expected JSON input (all fields optional):
+    {
+        "version": "v20261017-120000",  # defaults to the newest version
+        "wait": true                    # false loads in the background
+    }
+    
+    The new version is loaded and warmed up while the current one keeps
+    serving, then becomes active for new requests; requests in flight finish
+    on the old version. The registry's ACTIVE pointer is updated so other
+    worker processes follow through the watcher. Roll back by reloading an
+    older version.
+    
+    Returns:
+        JSON: The newly active bundle (200), or the accepted version (202)
+        when not waiting
+    """
+    denied = admin_denied()
+    if denied:
+        return denied
+    
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if version is not None and version not in registry.versions():
+        return jsonify({
+            'error': 'Unknown version',
+            'message': f'Model version {version} not found in {MODEL_REGISTRY_DIR}'
+        }), 404
+    if version is None and not registry.versions():
+        return jsonify({
+            'error': 'Empty registry',
+            'message': f'No model versions in {MODEL_REGISTRY_DIR}'
+        }), 404
+    
+    if not data.get('wait', True):
+        def reload_in_background():
+            try:
+                reload_model(version)
+            except Exception as e:
+                print(f"Model reload failed: {str(e)}")
+        
+        threading.Thread(target=reload_in_background, name='model-reload', daemon=True).start()
+        return jsonify({'status': 'loading', 'version': version}), 202
+    
+    try:
+        bundle = reload_model(version)
+    except Exception as e:
+        return jsonify({
+            'error': 'Reload failed',
+            'message': str(e)
+        }), 500
+    return jsonify({'status': 'active', 'model': bundle.describe()}), 200
+
+
+def iter_lines(stream, block_size=64 * 1024, max_line_bytes=None):
+    """
+    Read a byte stream line by line in fixed-size blocks.
+    
+    A line spanning several blocks is collected as a list of pieces and
+    joined once. Lines longer than max_line_bytes are not kept in memory:
+    their bytes are dropped up to the next newline and None is yielded in
+    their place.
+    
+    Args:
+        stream: File-like object with read()
+        block_size (int): Bytes read at a time
+        max_line_bytes (int): Longest line yielded; None for no limit
+        
+    Yields:
+        bytes: Lines without the trailing newline, or None for a line
+        longer than max_line_bytes
+    """
+    limit = max_line_bytes if max_line_bytes is not None else float('inf')
+    pending = []
+    pending_bytes = 0
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        lines = block.split(b'\n')
+        tail = lines.pop()
+        if lines:
+            head = lines[0]
+            if pending_bytes + len(head) > limit:
+                yield None
+            else:
+                yield b''.join(pending + [head]) if pending else head
+            for line in lines[1:]:
+                yield None if len(line) > limit else line
+            pending = []
+            pending_bytes = 0
+        pending_bytes += len(tail)
+        # Once over the limit only the byte count is kept
+        if pending_bytes > limit:
+            pending = []
+        elif tail:
+            pending.append(tail)
+    if pending_bytes > limit:
+        yield None
+    elif pending:
+        yield b''.join(pending)
+
+
+def parse_stream_line(line, is_ndjson):
+    """
+    Extract the review and optional id from one input line.
+    
+    NDJSON lines may be a JSON string or an object with a "review" field
+    and an optional "id"; plain text lines are the review itself.
+    
+    Args:
+        line (bytes): Raw input line, or None for an overlong line
+        is_ndjson (bool): Whether the body is NDJSON
+        
+    Returns:
+        tuple: (review, id, error); review is None when error is set
+    """
+    if line is None:
+        return None, None, f'Line exceeds {STREAM_MAX_LINE_BYTES} bytes'
+    text = line.decode('utf-8', errors='replace').rstrip('\r')
+    if not is_ndjson:
+        return text, None, None
+    try:
+        item = json.loads(text)
+    except ValueError:
+        return None, None, 'Invalid JSON line'
+    if isinstance(item, dict):
+        return item.get('review'), item.get('id'), None
+    return item, None, None
+
+
+@app.route('/stream_predict', methods=['POST'])
+def stream_predict():
+    """
+    Stream predictions for a newline-delimited request body.
+    
+    Accepts NDJSON (Content-Type application/x-ndjson), one JSON string or
+    {"review": "...", "id": ...} object per line, or plain text with one
+    review per line. The body may use chunked transfer encoding. Lines
+    longer than STREAM_MAX_LINE_BYTES get an error record. Lines are
+    scored in batches of STREAM_BATCH_SIZE and results are streamed back as
+    NDJSON while the body is still being read, so memory stays constant
+    regardless of input size.
+    
+    Query parameters:
+        include_text: "true" to echo each original review
+    
+    Returns:
+        NDJSON: One object per non-empty input line with its "index",
+        the "id" if one was given, and the prediction or an "error"
+    """
+    bundle = active_bundle
+    if bundle is None:
+        return jsonify({
+            'error': 'Model not loaded',
+            'message': 'Please train the model first'
+        }), 503
+    
+    is_ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json')
+    include_text = request.args.get('include_text', 'false').lower() in ('1', 'true', 'yes')
+    stream = request.stream
+    
+    def score_lines(lines):
+        parsed = [parse_stream_line(line, is_ndjson) for _, line in lines]
+        if METRICS_ENABLED:
+            BATCH_SIZE.observe(len(lines), endpoint='stream_predict')
+        results = predict_batch(bundle.scorer, bundle.vectorizer, [review for review, _, _ in parsed],
+                                chunk_size=STREAM_BATCH_SIZE)
+        for (index, _), (_, item_id, error), result in zip(lines, parsed, results):
+            result['index'] = index
+            if item_id is not None:
+                result['id'] = item_id
+            if error is not None:
+                result['error'] = error
+            if not include_text:
+                result.pop('original_review', None)
+            yield json.dumps(result) + '\n'
+    
+    def generate():
+        lines = []
+        for index, line in enumerate(iter_lines(stream, max_line_bytes=STREAM_MAX_LINE_BYTES)):
+            if line is not None and not line.strip():
+                continue
+            lines.append((index, line))
+            if len(lines) >= STREAM_BATCH_SIZE:
+                yield ''.join(score_lines(lines))
+                lines = []
+        if lines:
+            yield ''.join(score_lines(lines))
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors."""
@@ -289,6 +1031,69 @@ def internal_error(error):
     }), 500
 
 
+def warm_up():
+    """
+    Load lazily loaded resources and exercise the scoring path once.
+    
+    Run before or right after the server starts accepting traffic so the
+    first real request does not pay for importing NLTK, loading corpora
+    or first-call overhead.
+    """
+    bundle = active_bundle
+    if bundle is not None:
+        predict_batch(bundle.scorer, bundle.vectorizer, [WARMUP_REVIEW])
+    warm_up_preprocessing(tokenizer=WARMUP_TOKENIZER)
+
+
+def start_up():
+    """Load the model if needed and warm up, recording the timings in startup."""
+    startup['state'] = 'starting'
+    start = time.perf_counter()
+    if active_bundle is None:
+        load_model_and_vectorizer()
+    if active_bundle is None:
+        print("Warning: Starting server without trained model.")
+    loaded = time.perf_counter()
+    startup['model_load_seconds'] = round(loaded - start, 4)
+    warm_up()
+    startup['warmup_seconds'] = round(time.perf_counter() - loaded, 4)
+    startup['lemmatizer'] = preprocess.lemmatizer_name()
+    startup['ready_seconds'] = round(time.perf_counter() - _import_started, 4)
+    startup['state'] = 'ready'
+
+
+def create_app(background_warmup=None):
+    """
+    Application factory for production WSGI servers.
+    
+    Loads the model and warms up the scoring path, so a server importing
+    the app (e.g. wsgi.py, serve.py) starts ready to predict. When used by
+    a pre-fork server, call it in the master process before forking so
+    workers share the loaded model copy-on-write.
+    
+    Args:
+        background_warmup (bool): Load and warm up in a background thread
+            and return at once (defaults to BACKGROUND_WARMUP); /predict
+            answers 503 until the model is in. Not for pre-fork servers,
+            since the thread does not survive fork().
+    
+    Returns:
+        Flask: The configured application
+    """
+    if background_warmup is None:
+        background_warmup = BACKGROUND_WARMUP
+    app.debug = False
+    startup['background'] = background_warmup
+    if background_warmup:
+        startup['state'] = 'starting'
+        threading.Thread(target=start_up, name='startup', daemon=True).start()
+    else:
+        start_up()
+    return app
+
+
+startup['import_seconds'] = round(time.perf_counter() - _import_started, 4)
+
 if __name__ == '__main__':
     print("="*60)
     print("RESTAURANT SENTIMENT ANALYSIS - FLASK API")
@@ -0,0 +1,367 @@
+"""
+Memory-Mapped Model Artifact Format
+====================================
+Pickle-free alternative to sentiment_model.pkl / vectorizer.pkl.
+
+An artifact is a directory holding:
+- manifest.json: format version, vectorizer settings, classes and the
+  SHA-256 checksum of every array file
+- vocab_terms.npy: vocabulary as a sorted fixed-width byte-string table
+- vocab_columns.npy: feature column of each term in vocab_terms
+- idf.npy, coef.npy, intercept.npy, calib_a.npy, calib_b.npy: numeric arrays
+
+Artifacts of a hashed featurizer (features.py, manifest "vectorizer_type":
+"hashed") have no vocabulary files and store doc_freq.npy instead, so the
+IDF can keep being updated.
+
+Compact artifacts (quantize.py) store coef.npy as float32 or int8, with
+coef_scale.npy (int8 scale per fold) and, for hashed featurizers,
+coef_rows.npy (the coef row of each feature column). Their idf.npy is
+float32, and hashed ones have no doc_freq.npy as they are only served.
+They are written as format version 2 so that version 1 loaders reject them.
+
+Arrays are opened with np.load(mmap_mode='r'), so every worker process on a
+host shares the same page-cache pages instead of building its own copy of
+the vocabulary dict and coefficients, and nothing is unpickled on load.
+"""
+
+import os
+import re
+import json
+import hashlib
+import unicodedata
+
+import numpy as np
+import scipy.sparse as sp
+
+from scorer import CompiledLinearScorer, QuantizedLinearScorer
+from features import HashedNgramFeaturizer, token_ngrams
+
+FORMAT_NAME = 'restro-sentiment'
+FORMAT_VERSION = 1
+QUANTIZED_FORMAT_VERSION = 2
+MANIFEST_FILE = 'manifest.json'
+
+# TfidfVectorizer settings that affect transform and are stored in the manifest
+VECTORIZER_PARAMS = ('lowercase', 'strip_accents', 'token_pattern', 'ngram_range', 'analyzer',
+                     'stop_words', 'binary', 'norm', 'use_idf', 'sublinear_tf')
+
+
+def file_sha256(path):
+    """
+    Compute the SHA-256 checksum of a file.
+
+    Args:
+        path (str): File path
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_artifact_dir(directory):
+    """
+    Check whether a directory contains a mapped artifact.
+
+    Args:
+        directory (str): Directory path
+
+    Returns:
+        bool: True if a manifest is present
+    """
+    return os.path.isfile(os.path.join(directory, MANIFEST_FILE))
+
+
+def _strip_accents_unicode(text):
+    if text.isascii():
+        return text
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def _strip_accents_ascii(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+
+def build_word_analyzer(params):
+    """
+    Build the analyzer of a TfidfVectorizer without importing scikit-learn.
+
+    Reproduces build_analyzer() for word analyzers with an explicit stop
+    word list (as written by save_artifact); other settings, such as the
+    'english' stop word name in older artifacts, use scikit-learn itself.
+
+    Args:
+        params (dict): Stored TfidfVectorizer settings
+
+    Returns:
+        callable: Maps a document to its list of n-grams
+    """
+    strip_accents = params['strip_accents']
+    if (params['analyzer'] != 'word' or isinstance(params['stop_words'], str)
+            or strip_accents not in (None, 'ascii', 'unicode')):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        return TfidfVectorizer(**params).build_analyzer()
+
+    accent_function = {'ascii': _strip_accents_ascii, 'unicode': _strip_accents_unicode}.get(strip_accents)
+    lowercase = params['lowercase']
+    find_tokens = re.compile(params['token_pattern']).findall
+    stop_words = frozenset(params['stop_words'] or ())
+    ngram_range = tuple(params['ngram_range'])
+
+    def analyze(doc):
+        if lowercase:
+            doc = doc.lower()
+        if accent_function is not None:
+            doc = accent_function(doc)
+        tokens = find_tokens(doc)
+        if stop_words:
+            tokens = [token for token in tokens if token not in stop_words]
+        return token_ngrams(tokens, ngram_range)
+
+    return analyze
+
+
+class MappedTfidfVectorizer:
+    """
+    TF-IDF transform over a sorted, memory-mapped vocabulary table.
+
+    Produces the same matrix as the TfidfVectorizer it was exported from.
+    Terms are looked up for a whole batch at once with np.searchsorted
+    instead of through a Python dict.
+
+    Attributes:
+        terms (ndarray): Sorted vocabulary as fixed-width UTF-8 byte strings
+        columns (ndarray): Feature column of each term in terms
+        idf_ (ndarray): Inverse document frequency per feature column
+        params (dict): TfidfVectorizer settings used for analysis
+    """
+
+    def __init__(self, terms, columns, idf, params):
+        self.terms = terms
+        self.columns = columns
+        self.idf_ = idf
+        self.params = params
+        self._analyzer = build_word_analyzer(params)
+
+    @classmethod
+    def from_tfidf(cls, vectorizer):
+        """
+        Build the mapped equivalent of a fitted TfidfVectorizer.
+
+        Args:
+            vectorizer: Fitted TfidfVectorizer
+
+        Returns:
+            MappedTfidfVectorizer: Vectorizer producing the same matrix
+
+        Raises:
+            ValueError: If the vectorizer uses custom callables
+        """
+        all_params = vectorizer.get_params()
+        params = {name: all_params[name] for name in VECTORIZER_PARAMS}
+        if any(callable(all_params[name]) for name in ('preprocessor', 'tokenizer', 'analyzer')):
+            raise ValueError("Vectorizers with custom callables cannot be exported")
+        # Store the resolved stop word list (not e.g. 'english') so loading needs no scikit-learn
+        stop_words = vectorizer.get_stop_words()
+        params['stop_words'] = sorted(stop_words) if stop_words is not None else None
+        params['ngram_range'] = list(params['ngram_range'])
+        vocabulary = sorted((term.encode('utf-8'), column) for term, column in vectorizer.vocabulary_.items())
+        terms = np.array([term for term, _ in vocabulary])
+        columns = np.array([column for _, column in vocabulary], dtype=np.int32)
+        return cls(terms, columns, np.asarray(vectorizer.idf_, dtype=np.float64), params)
+
+    @property
+    def n_features(self):
+        return self.idf_.shape[0]
+
+    def get_feature_names_out(self):
+        """
+        Return feature names ordered by column.
+
+        Returns:
+            ndarray: Term of each feature column
+        """
+        names = np.empty(self.n_features, dtype=object)
+        names[self.columns] = [term.decode('utf-8') for term in self.terms]
+        return names
+
+    def transform(self, raw_documents):
+        """
+        Transform documents to a TF-IDF matrix.
+
+        Args:
+            raw_documents (list): Documents to transform
+
+        Returns:
+            csr_matrix: (n_documents, n_features) TF-IDF matrix
+        """
+        doc_ids, needles = [], []
+        for i, doc in enumerate(raw_documents):
+            grams = self._analyzer(doc)
+            doc_ids.extend([i] * len(grams))
+            needles.extend(gram.encode('utf-8') for gram in grams)
+
+        n_docs = len(raw_documents)
+        rows = np.asarray(doc_ids, dtype=np.int64)
+        cols = np.empty(0, dtype=np.int64)
+        if needles:
+            needles = np.asarray(needles)
+            # Longer needles cannot be in the table and would be truncated by the cast
+            fits = np.char.str_len(needles) <= self.terms.dtype.itemsize
+            rows, needles = rows[fits], needles[fits].astype(self.terms.dtype)
+            positions = np.minimum(np.searchsorted(self.terms, needles), len(self.terms) - 1)
+            found = self.terms[positions] == needles
+            rows, cols = rows[found], self.columns[positions[found]].astype(np.int64)
+
+        X = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_docs, self.n_features))
+        X.sum_duplicates()
+        if self.params['binary']:
+            X.data[:] = 1.0
+        elif self.params['sublinear_tf']:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.params['use_idf']:
+            X.data *= np.take(self.idf_, X.indices)
+        norm = self.params['norm']
+        if norm:
+            row_of_value = np.repeat(np.arange(n_docs), np.diff(X.indptr))
+            values = np.abs(X.data) if norm == 'l1' else X.data ** 2
+            totals = np.bincount(row_of_value, weights=values, minlength=n_docs)
+            if norm == 'l2':
+                totals = np.sqrt(totals)
+            totals[totals == 0] = 1.0
+            X.data /= totals[row_of_value]
+        return X
+
+
+def save_artifact(model, vectorizer, directory, compression=None):
+    """
+    Write a model and TF-IDF vectorizer in the mapped artifact format.
+
+    Args:
+        model: Fitted model supported by CompiledLinearScorer.from_model,
+            or a CompiledLinearScorer / QuantizedLinearScorer
+        vectorizer: Fitted TfidfVectorizer or HashedNgramFeaturizer
+        directory (str): Output directory (created if missing)
+        compression (dict): Pruning/quantization summary stored in the
+            manifest of compact artifacts
+
+    Returns:
+        dict: The written manifest
+
+    Raises:
+        ValueError: If the model or vectorizer cannot be exported
+    """
+    scorer = model if isinstance(model, CompiledLinearScorer) else CompiledLinearScorer.from_model(model)
+    if scorer is None:
+        raise ValueError(f"Model of type {type(model).__name__} cannot be exported as a linear scorer")
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer_type = 'tfidf'
+    extra = {}
+    if isinstance(vectorizer, HashedNgramFeaturizer):
+        vectorizer_type, params, idf = 'hashed', vectorizer.params, np.asarray(vectorizer.idf_)
+        vectorizer_arrays = {'idf': idf}
+        if vectorizer.doc_freq_ is not None:
+            vectorizer_arrays['doc_freq'] = vectorizer.doc_freq_
+        extra['n_docs'] = int(vectorizer.n_docs_)
+    elif isinstance(vectorizer, (MappedTfidfVectorizer, TfidfVectorizer)):
+        if isinstance(vectorizer, TfidfVectorizer):
+            vectorizer = MappedTfidfVectorizer.from_tfidf(vectorizer)
+        terms, columns, idf, params = vectorizer.terms, vectorizer.columns, vectorizer.idf_, vectorizer.params
+    else:
+        raise ValueError(f"Vectorizer of type {type(vectorizer).__name__} cannot be exported")
+
+    if vectorizer_type == 'tfidf':
+        vectorizer_arrays = {'vocab_terms': terms, 'vocab_columns': columns, 'idf': idf}
+    arrays = {
+        **vectorizer_arrays,
+        'coef': scorer.coef,
+        'intercept': scorer.intercept,
+        'calib_a': scorer.a,
+        'calib_b': scorer.b,
+    }
+    quantized = isinstance(scorer, QuantizedLinearScorer)
+    if quantized and scorer.scale is not None:
+        arrays['coef_scale'] = scorer.scale
+    if quantized and scorer.rows is not None:
+        arrays['coef_rows'] = scorer.rows
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for name, array in arrays.items():
+        filename = f'{name}.npy'
+        path = os.path.join(directory, filename)
+        np.save(path, np.ascontiguousarray(array), allow_pickle=False)
+        files[name] = {'file': filename, 'sha256': file_sha256(path), 'bytes': os.path.getsize(path)}
+
+    checksum = hashlib.sha256(''.join(f['sha256'] for f in files.values()).encode('ascii')).hexdigest()
+    manifest = {
+        'format': FORMAT_NAME,
+        'format_version': QUANTIZED_FORMAT_VERSION if quantized else FORMAT_VERSION,
+        'checksum': checksum,
+        'classes': [int(c) for c in scorer.classes_],
+        'n_features': int(idf.shape[0]),
+        'n_folds': int(scorer.n_folds),
+        'vectorizer_type': vectorizer_type,
+        'vectorizer': params,
+        **extra,
+        **({'compression': compression} if compression else {}),
+        'files': files,
+    }
+    tmp_path = os.path.join(directory, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+    return manifest
+
+
+def load_artifact(directory, verify=True):
+    """
+    Load a mapped artifact without unpickling anything.
+
+    Args:
+        directory (str): Artifact directory
+        verify (bool): Check every array file against its manifest checksum
+
+    Returns:
+        tuple: (scorer, vectorizer, manifest); the scorer is a
+        CompiledLinearScorer (a QuantizedLinearScorer for compact
+        artifacts) and the vectorizer a MappedTfidfVectorizer or a
+        HashedNgramFeaturizer
+
+    Raises:
+        ValueError: If the manifest is unsupported or a checksum mismatches
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if (manifest.get('format') != FORMAT_NAME
+            or manifest.get('format_version') not in (FORMAT_VERSION, QUANTIZED_FORMAT_VERSION)):
+        raise ValueError(f"Unsupported artifact format in {directory}: "
+                         f"{manifest.get('format')} v{manifest.get('format_version')}")
+
+    arrays = {}
+    for name, entry in manifest['files'].items():
+        path = os.path.join(directory, entry['file'])
+        if verify and file_sha256(path) != entry['sha256']:
+            raise ValueError(f"Checksum mismatch for {path}")
+        arrays[name] = np.load(path, mmap_mode='r', allow_pickle=False)
+
+    params = dict(manifest['vectorizer'])
+    params['ngram_range'] = tuple(params['ngram_range'])
+    if manifest.get('vectorizer_type', 'tfidf') == 'hashed':
+        vectorizer = HashedNgramFeaturizer(**params)
+        vectorizer.idf_, vectorizer.doc_freq_ = arrays['idf'], arrays.get('doc_freq')
+        vectorizer.n_docs_ = manifest['n_docs']
+    else:
+        vectorizer = MappedTfidfVectorizer(arrays['vocab_terms'], arrays['vocab_columns'], arrays['idf'], params)
+    scorer_arrays = (arrays['coef'], arrays['intercept'], arrays['calib_a'], arrays['calib_b'], manifest['classes'])
+    if manifest['format_version'] == QUANTIZED_FORMAT_VERSION:
+        scorer = QuantizedLinearScorer(*scorer_arrays, scale=arrays.get('coef_scale'), rows=arrays.get('coef_rows'))
+    else:
+        scorer = CompiledLinearScorer(*scorer_arrays)
+    return scorer, vectorizer, manifest
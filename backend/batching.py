@@ -0,0 +1,146 @@
+"""
+Dynamic Micro-Batching for Single-Review Predictions
+=====================================================
+Collects concurrent single-review requests into a short-lived queue and
+scores them together, so a burst of /predict calls pays the vectorize and
+score overhead once per batch instead of once per request.
+
+A batch is flushed when it reaches max_batch_size or when the oldest item
+has waited max_wait_us microseconds, whichever comes first.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class QueueFullError(Exception):
+    """Raised when the batching queue has reached its maximum depth."""
+
+
+class MicroBatcher:
+    """
+    Background thread that groups submitted items into scoring batches.
+
+    Args:
+        score_fn (callable): Called with a list of items; must return one
+            result per item, in the same order
+        max_batch_size (int): Maximum items per batch
+        max_wait_us (int): Maximum time the first item of a batch waits
+            for more items, in microseconds
+        max_queue_depth (int): Maximum number of waiting items; further
+            submissions raise QueueFullError
+    """
+
+    def __init__(self, score_fn, max_batch_size=32, max_wait_us=2000, max_queue_depth=1024):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1e6
+        self.max_queue_depth = max_queue_depth
+        self._queue = queue.Queue(maxsize=max_queue_depth)
+        self._lock = threading.Lock()
+        # Counters are updated by the batching thread and, for rejections, by
+        # any number of request threads at once
+        self._stats_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.largest_batch = 0
+        self.flushed_full = 0
+        self.flushed_timeout = 0
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue_depth)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, item, timeout=None):
+        """
+        Queue an item and block until its batch has been scored.
+
+        Args:
+            item: Item passed to score_fn as part of a batch
+            timeout (float): Maximum seconds to wait for the result
+
+        Returns:
+            object: The result score_fn produced for this item
+
+        Raises:
+            QueueFullError: If the queue is at max_queue_depth
+        """
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            raise QueueFullError(f"Batching queue is full ({self.max_queue_depth} waiting)")
+        return future.result(timeout=timeout)
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.score_fn(items)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            with self._stats_lock:
+                if len(batch) >= self.max_batch_size:
+                    self.flushed_full += 1
+                else:
+                    self.flushed_timeout += 1
+                self.batches += 1
+                self.items += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self):
+        """
+        Report configuration and batching counters.
+
+        Returns:
+            dict: Settings, batch counts, mean batch size and queue depth
+        """
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_us': int(self.max_wait * 1e6),
+                'max_queue_depth': self.max_queue_depth,
+                'queue_depth': self._queue.qsize(),
+                'batches': self.batches,
+                'items': self.items,
+                'mean_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'flushed_full': self.flushed_full,
+                'flushed_timeout': self.flushed_timeout,
+                'rejected': self.rejected
+            }
@@ -0,0 +1,228 @@
+"""
+Benchmark Suite for Restaurant Sentiment Analysis
+Measures preprocessing throughput, vectorize+score throughput for single and batched
+calls (with and without explanations), and end-to-end /predict and /batch_predict
+latency through the Flask test client.
+
+Reviews come from a seeded synthetic corpus (or a CSV column), so two runs on the same
+machine see the same inputs. Results are written as JSON; pass a previous results file
+with --compare to flag benchmarks that got slower than --threshold.
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --output new.json --compare bench.json --threshold 0.10
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import platform
+import argparse
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+import app
+from cache import LRUCache
+from synthetic import generate_corpus
+from preprocess import preprocess_text
+from inference import score_processed, score_and_explain
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+logger = logging.getLogger('benchmark')
+
+# Metrics where a larger value is better; all other compared metrics are latencies
+HIGHER_IS_BETTER = ('docs_per_second',)
+COMPARED_METRICS = ('docs_per_second', 'p50_ms', 'p95_ms')
+
+
+def load_corpus(path, text_col, n_reviews, seed=42):
+    texts = pd.read_csv(path, usecols=[text_col])[text_col].dropna().astype(str).tolist()
+    random.Random(seed).shuffle(texts)
+    return texts[:n_reviews]
+
+
+def summarize(timings, docs):
+    timings = np.asarray(timings)
+    return {
+        'calls': int(len(timings)),
+        'docs_per_second': float(docs / timings.sum()) if timings.sum() > 0 else 0.0,
+        'p50_ms': float(np.percentile(timings, 50) * 1000),
+        'p95_ms': float(np.percentile(timings, 95) * 1000),
+        'p99_ms': float(np.percentile(timings, 99) * 1000),
+        'mean_ms': float(timings.mean() * 1000),
+    }
+
+
+def time_calls(fn, args_list, warmup=5):
+    for args in args_list[:warmup]:
+        fn(*args)
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_preprocess(texts):
+    return summarize(time_calls(preprocess_text, [(t,) for t in texts]), len(texts))
+
+
+def bench_score_single(bundle, processed):
+    timings = time_calls(score_processed, [(bundle.scorer, bundle.vectorizer, [t]) for t in processed])
+    return summarize(timings, len(processed))
+
+
+def bench_score_batch(bundle, processed, batch_size):
+    batches = [(bundle.scorer, bundle.vectorizer, processed[i:i + batch_size])
+               for i in range(0, len(processed) - batch_size + 1, batch_size)] or \
+              [(bundle.scorer, bundle.vectorizer, processed)]
+    timings = time_calls(score_processed, batches, warmup=1)
+    return summarize(timings, sum(len(batch[2]) for batch in batches))
+
+
+def bench_score_explain_batch(bundle, processed, batch_size):
+    batches = [(bundle.scorer, bundle.vectorizer, processed[i:i + batch_size], bundle.explainer, 5)
+               for i in range(0, len(processed) - batch_size + 1, batch_size)] or \
+              [(bundle.scorer, bundle.vectorizer, processed, bundle.explainer, 5)]
+    timings = time_calls(score_and_explain, batches, warmup=1)
+    return summarize(timings, sum(len(batch[2]) for batch in batches))
+
+
+def bench_api_predict(client, texts):
+    def call(text):
+        response = client.post('/predict', json={'review': text})
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return summarize(time_calls(call, [(t,) for t in texts]), len(texts))
+
+
+def bench_api_batch_predict(client, texts, batch_size):
+    def call(batch):
+        response = client.post('/batch_predict', json={'reviews': batch})
+        assert response.status_code == 200, response.get_data(as_text=True)
+    batches = [(texts[i:i + batch_size],) for i in range(0, len(texts) - batch_size + 1, batch_size)] or [(texts,)]
+    return summarize(time_calls(call, batches, warmup=1), sum(len(batch[0]) for batch in batches))
+
+
+def run_benchmarks(texts, batch_sizes, api_requests):
+    app.load_model_and_vectorizer()
+    bundle = app.active_bundle
+    if bundle is None:
+        raise RuntimeError("No trained model found; run train_model.py first")
+    # Repeated inputs must not be answered from the prediction cache
+    app.prediction_cache = LRUCache(0)
+    app.warm_up()
+
+    results = {}
+    logger.info(f"preprocess_text over {len(texts)} reviews...")
+    results['preprocess'] = bench_preprocess(texts)
+    processed = [preprocess_text(t) for t in texts]
+
+    logger.info("Single-review vectorize + score...")
+    results['score_single'] = bench_score_single(bundle, processed)
+    for batch_size in batch_sizes:
+        logger.info(f"Batched vectorize + score, batch size {batch_size}...")
+        results[f'score_batch_{batch_size}'] = bench_score_batch(bundle, processed, batch_size)
+    if bundle.explainer.available:
+        for batch_size in batch_sizes:
+            logger.info(f"Batched vectorize + score + explain, batch size {batch_size}...")
+            results[f'score_explain_batch_{batch_size}'] = bench_score_explain_batch(bundle, processed, batch_size)
+
+    client = app.app.test_client()
+    api_texts = texts[:api_requests]
+    logger.info(f"/predict x {len(api_texts)}...")
+    results['api_predict'] = bench_api_predict(client, api_texts)
+    for batch_size in batch_sizes:
+        logger.info(f"/batch_predict, batch size {batch_size}...")
+        results[f'api_batch_predict_{batch_size}'] = bench_api_batch_predict(client, texts, batch_size)
+    return results, bundle.version
+
+
+def compare_results(current, baseline, threshold):
+    # Returns (benchmark, metric, baseline, current, relative change) for every metric
+    # that got worse by more than threshold.
+    regressions = []
+    for name, metrics in current.items():
+        if name not in baseline:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = baseline[name].get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > threshold:
+                regressions.append((name, metric, old, new, change))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark preprocessing, inference and the API.')
+    parser.add_argument('--reviews', type=int, default=2000, help='Number of reviews in the corpus')
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the synthetic corpus')
+    parser.add_argument('--mean-sentences', type=float, default=5.0,
+                        help='Mean review length in sentences for the synthetic corpus')
+    parser.add_argument('--length-sigma', type=float, default=0.6,
+                        help='Spread (log-normal sigma) of synthetic review lengths')
+    parser.add_argument('--corpus', help='CSV file to sample reviews from instead of the synthetic corpus')
+    parser.add_argument('--text-col', default='Review Text', help='Review column of --corpus')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[32, 256],
+                        help='Batch sizes for batched scoring and /batch_predict')
+    parser.add_argument('--api-requests', type=int, default=500, help='Number of /predict requests')
+    parser.add_argument('--output', default='benchmark_results.json', help='Results file (default: %(default)s)')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Relative slowdown reported as a regression (default: %(default)s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.corpus:
+        texts = load_corpus(args.corpus, args.text_col, args.reviews, seed=args.seed)
+    else:
+        texts = generate_corpus(args.reviews, seed=args.seed, mean_sentences=args.mean_sentences,
+                                sigma=args.length_sigma)
+
+    results, model_version = run_benchmarks(texts, args.batch_sizes, args.api_requests)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'model_version': model_version,
+            'corpus': args.corpus or 'synthetic',
+            'reviews': len(texts),
+            'mean_chars': float(np.mean([len(t) for t in texts])),
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote results to {args.output}")
+    for name, metrics in results.items():
+        logger.info(f"  {name:<28} {metrics['docs_per_second']:>12,.0f} docs/s   "
+                    f"p50 {metrics['p50_ms']:8.3f} ms   p95 {metrics['p95_ms']:8.3f} ms")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline['results'], args.threshold)
+        for name, metric, old, new, change in regressions:
+            logger.warning(f"REGRESSION {name}.{metric}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+        if regressions:
+            sys.exit(1)
+        logger.info(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Preprocessed Corpus Cache
+=========================
+On-disk cache of preprocessed review texts for train_model.py.
+
+Rows are keyed by a content hash of the raw review and stored in Parquet
+files under a directory named after preprocess.pipeline_fingerprint(), so
+changing the preprocessing rules or stopword set starts a fresh cache.
+Each run appends one part file with the rows it had to preprocess.
+"""
+
+import os
+import glob
+import hashlib
+
+import pandas as pd
+
+from preprocess import preprocess_many, pipeline_fingerprint
+
+
+def text_key(text):
+    """
+    Compute the cache key of a raw review.
+
+    Args:
+        text (str): Raw review text
+
+    Returns:
+        str: 32 hex digit BLAKE2b hash of the UTF-8 text
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class PreprocessedCorpusCache:
+    """
+    Cache of raw-text-hash -> preprocessed text, backed by Parquet parts.
+
+    Attributes:
+        directory (str): Directory holding the parts for this fingerprint
+        fingerprint (str): Preprocessing pipeline fingerprint
+        hits (int): Rows served from the cache by the last preprocess call
+        misses (int): Rows preprocessed by the last preprocess call
+    """
+
+    def __init__(self, cache_dir, fingerprint=None):
+        self.fingerprint = fingerprint or pipeline_fingerprint()
+        self.directory = os.path.join(cache_dir, self.fingerprint)
+        self.hits = 0
+        self.misses = 0
+        self._entries = None
+
+    def _part_paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'part-*.parquet')))
+
+    def load(self):
+        """
+        Read every cached part into memory.
+
+        Returns:
+            dict: key -> preprocessed text
+        """
+        if self._entries is None:
+            self._entries = {}
+            for path in self._part_paths():
+                part = pd.read_parquet(path, columns=['key', 'processed'])
+                self._entries.update(zip(part['key'], part['processed']))
+        return self._entries
+
+    def __len__(self):
+        return len(self.load())
+
+    def append(self, keys, processed):
+        """
+        Persist newly preprocessed rows as a new part file.
+
+        Args:
+            keys (list): Cache keys
+            processed (list): Preprocessed texts, aligned with keys
+        """
+        if not keys:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'part-{len(self._part_paths()):05d}.parquet')
+        tmp_path = path + '.tmp'
+        pd.DataFrame({'key': keys, 'processed': processed}).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        self.load().update(zip(keys, processed))
+
+    def preprocess(self, texts, workers=1, chunk_size=10000, progress=None):
+        """
+        Preprocess texts, reusing cached rows and caching the new ones.
+
+        Args:
+            texts (list): Raw texts
+            workers (int): Worker processes used for uncached rows
+            chunk_size (int): Texts per worker chunk
+            progress (callable): Optional progress(done, total) callback
+                for the uncached rows
+
+        Returns:
+            list: Preprocessed texts, in input order
+        """
+        entries = self.load()
+        keys = [text_key(text) for text in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in entries and key not in missing:
+                missing[key] = text
+
+        self.misses = len(missing)
+        self.hits = len(texts) - sum(1 for key in keys if key in missing)
+        if missing:
+            processed = preprocess_many(list(missing.values()), workers=workers,
+                                        chunk_size=chunk_size, progress=progress)
+            self.append(list(missing.keys()), processed)
+
+        return [entries[key] for key in keys]
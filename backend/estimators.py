@@ -0,0 +1,29 @@
+"""
+Timed Estimators
+================
+LinearSVC subclass that records how long each fit took, so the per-fold
+timings of CalibratedClassifierCV can be reported after training.
+
+It lives in its own module so that pickled calibrated models, whose fold
+estimators are TimedLinearSVC instances, can be loaded by anything that
+can import the backend modules (like HashedNgramFeaturizer in features.py).
+"""
+
+import time
+
+from sklearn.svm import LinearSVC
+
+
+class TimedLinearSVC(LinearSVC):
+    """
+    LinearSVC that stores its fit time in fit_seconds_.
+
+    Behaves exactly like LinearSVC otherwise; the fitted weights do not
+    depend on the subclass.
+    """
+
+    def fit(self, X, y, sample_weight=None):
+        start = time.perf_counter()
+        super().fit(X, y, sample_weight=sample_weight)
+        self.fit_seconds_ = time.perf_counter() - start
+        return self
@@ -0,0 +1,164 @@
+"""
+Hashed N-gram Featurizer
+========================
+Vocabulary-free alternative to TfidfVectorizer that works on the tokens
+produced by preprocess.preprocess_tokens.
+
+Unigrams and bigrams are mapped to a fixed number of columns with the
+hashing trick (sklearn's FeatureHasher, MurmurHash3), so there is no term
+dict to build, pickle or look up, and the text is not tokenized a second
+time. Stored IDF weights are a plain NumPy array of n_features floats.
+Document frequencies are kept as counts, so the IDF can be updated with
+partial_fit as new data arrives.
+"""
+
+import numpy as np
+
+DEFAULT_N_FEATURES = 2 ** 18
+
+
+def token_ngrams(tokens, ngram_range=(1, 2)):
+    """
+    Build the n-gram strings of one token list.
+
+    Args:
+        tokens (list): Preprocessed tokens
+        ngram_range (tuple): (min_n, max_n)
+
+    Returns:
+        list: N-grams, each joined with a single space
+    """
+    min_n, max_n = ngram_range
+    grams = list(tokens) if min_n == 1 else []
+    for n in range(max(min_n, 2), max_n + 1):
+        grams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return grams
+
+
+class HashedNgramFeaturizer:
+    """
+    TF-IDF over hashed unigram and bigram features.
+
+    Args:
+        n_features (int): Number of hashed feature columns
+        ngram_range (tuple): (min_n, max_n) n-gram sizes
+        sublinear_tf (bool): Use 1 + log(tf) instead of raw counts
+        norm (str): 'l2', 'l1' or None row normalization
+
+    Attributes:
+        idf_ (ndarray): Smoothed inverse document frequency per column
+        doc_freq_ (ndarray): Number of fitted documents containing each column
+        n_docs_ (int): Number of fitted documents
+    """
+
+    def __init__(self, n_features=DEFAULT_N_FEATURES, ngram_range=(1, 2), sublinear_tf=False, norm='l2'):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+        self.doc_freq_ = np.zeros(n_features, dtype=np.int64)
+        self.n_docs_ = 0
+        self.idf_ = None
+        self._hasher = self._build_hasher()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_hasher']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._hasher = self._build_hasher()
+
+    def _build_hasher(self):
+        # Imported here so that importing this module does not load scikit-learn
+        from sklearn.feature_extraction import FeatureHasher
+        return FeatureHasher(n_features=self.n_features, input_type='string', alternate_sign=False)
+
+    @property
+    def params(self):
+        return {'n_features': self.n_features, 'ngram_range': list(self.ngram_range),
+                'sublinear_tf': self.sublinear_tf, 'norm': self.norm}
+
+    def _counts(self, token_lists):
+        return self._hasher.transform(token_ngrams(tokens, self.ngram_range) for tokens in token_lists).tocsr()
+
+    def partial_fit(self, token_lists):
+        """
+        Add documents to the document frequency counts and refresh the IDF.
+
+        Args:
+            token_lists (iterable): Token list per document
+
+        Returns:
+            HashedNgramFeaturizer: self
+        """
+        counts = self._counts(token_lists)
+        counts.sum_duplicates()
+        # Not in place: doc_freq_ may be a read-only memory-mapped array
+        self.doc_freq_ = self.doc_freq_ + np.bincount(counts.indices, minlength=self.n_features)
+        self.n_docs_ += counts.shape[0]
+        # Same smoothed IDF as TfidfVectorizer(smooth_idf=True)
+        self.idf_ = np.log((1 + self.n_docs_) / (1 + self.doc_freq_)) + 1.0
+        return self
+
+    def fit(self, token_lists):
+        """Fit the IDF from scratch; see partial_fit."""
+        self.doc_freq_ = np.zeros(self.n_features, dtype=np.int64)
+        self.n_docs_ = 0
+        return self.partial_fit(token_lists)
+
+    def transform_tokens(self, token_lists):
+        """
+        Featurize preprocessed token lists.
+
+        Args:
+            token_lists (list): Token list per document
+
+        Returns:
+            csr_matrix: (n_documents, n_features) TF-IDF matrix
+        """
+        X = self._counts(token_lists)
+        X.sum_duplicates()
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.idf_ is not None:
+            X.data *= np.take(self.idf_, X.indices)
+        if self.norm:
+            n_docs = X.shape[0]
+            row_of_value = np.repeat(np.arange(n_docs), np.diff(X.indptr))
+            values = np.abs(X.data) if self.norm == 'l1' else X.data ** 2
+            totals = np.bincount(row_of_value, weights=values, minlength=n_docs)
+            if self.norm == 'l2':
+                totals = np.sqrt(totals)
+            totals[totals == 0] = 1.0
+            X.data /= totals[row_of_value]
+        return X
+
+    def transform(self, processed_texts):
+        """
+        Featurize preprocessed texts (space-joined tokens, as returned by
+        preprocess_text).
+
+        Args:
+            processed_texts (list): Preprocessed texts
+
+        Returns:
+            csr_matrix: (n_documents, n_features) TF-IDF matrix
+        """
+        return self.transform_tokens([text.split() for text in processed_texts])
+
+    def fit_transform(self, processed_texts):
+        """
+        Fit the IDF on preprocessed texts and featurize them, like
+        TfidfVectorizer.fit_transform.
+
+        Args:
+            processed_texts (list): Preprocessed texts
+
+        Returns:
+            csr_matrix: (n_documents, n_features) TF-IDF matrix
+        """
+        token_lists = [text.split() for text in processed_texts]
+        return self.fit(token_lists).transform_tokens(token_lists)
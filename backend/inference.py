@@ -0,0 +1,242 @@
+"""
+Batch Inference Engine for Sentiment Analysis
+==============================================
+Scores many reviews at once: the whole list is preprocessed, vectorized with a
+single transform call and scored with a single predict_proba call per chunk.
+"""
+
+import time
+
+import numpy as np
+
+from preprocess import preprocess_text, preprocess_tokens
+from explain import DEFAULT_TOP_K
+
+# Maximum number of reviews vectorized and scored together.
+# Larger payloads are split into chunks of this size to bound peak memory.
+DEFAULT_CHUNK_SIZE = 1000
+
+SENTIMENT_LABELS = {0: 'Negative', 1: 'Positive'}
+
+# Optional callable(stage, seconds) receiving 'vectorize', 'score' and
+# 'explain' timings from score_processed; see set_stage_observer
+stage_observer = None
+
+
+def set_stage_observer(observer):
+    """
+    Report vectorize, score and explain timings, e.g. to latency metrics.
+
+    Args:
+        observer (callable): Called as observer(stage, seconds); None disables it
+    """
+    global stage_observer
+    stage_observer = observer
+
+
+def is_valid_review(review_text):
+    """
+    Check whether an item of a batch payload can be scored.
+
+    Args:
+        review_text: Item from the request payload
+
+    Returns:
+        bool: True if the item is a non-empty string
+    """
+    return isinstance(review_text, str) and len(review_text.strip()) > 0
+
+
+def iter_chunks(items, chunk_size):
+    """
+    Split a sequence into consecutive chunks.
+
+    Args:
+        items (list): Sequence to split
+        chunk_size (int): Maximum chunk length
+
+    Yields:
+        list: Consecutive slices of items
+    """
+    if chunk_size is None or chunk_size <= 0:
+        chunk_size = len(items) or 1
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
+
+
+def vectorize(vectorizer, processed_texts):
+    """
+    Vectorize preprocessed texts, or token lists for featurizers that
+    accept them directly (see features.HashedNgramFeaturizer).
+
+    Args:
+        vectorizer: Fitted vectorizer
+        processed_texts (list): Preprocessed texts or token lists
+
+    Returns:
+        sparse matrix: Feature matrix
+    """
+    if processed_texts and isinstance(processed_texts[0], list):
+        return vectorizer.transform_tokens(processed_texts)
+    return vectorizer.transform(processed_texts)
+
+
+def score_processed(model, vectorizer, processed_texts):
+    """
+    Vectorize and score already preprocessed texts in one call.
+
+    Labels are taken from the probabilities instead of a separate
+    model.predict call, so the model is evaluated only once.
+
+    Args:
+        model: Fitted classifier exposing predict_proba and classes_
+        vectorizer: Fitted vectorizer
+        processed_texts (list): Preprocessed review texts, or token lists
+            for vectorizers with transform_tokens
+
+    Returns:
+        tuple: (labels, probabilities) as NumPy arrays
+    """
+    observer = stage_observer
+    if observer is None:
+        X = vectorize(vectorizer, processed_texts)
+        probabilities = model.predict_proba(X)
+    else:
+        start = time.perf_counter()
+        X = vectorize(vectorizer, processed_texts)
+        vectorized = time.perf_counter()
+        probabilities = model.predict_proba(X)
+        observer('vectorize', vectorized - start)
+        observer('score', time.perf_counter() - vectorized)
+    labels = np.asarray(model.classes_)[probabilities.argmax(axis=1)]
+    return labels, probabilities
+
+
+def score_and_explain(model, vectorizer, processed_texts, explainer, top_k):
+    """
+    Score preprocessed texts and explain each prediction from the same
+    feature matrix, so explanations cost no second vectorization.
+
+    Args:
+        model: Fitted classifier exposing predict_proba and classes_
+        vectorizer: Fitted vectorizer
+        processed_texts (list): Preprocessed review texts or token lists
+        explainer (explain.Explainer): Explainer of the model
+        top_k (int): N-grams reported per direction
+
+    Returns:
+        tuple: (labels, probabilities, explanations)
+    """
+    observer = stage_observer
+    start = time.perf_counter()
+    X = vectorize(vectorizer, processed_texts)
+    vectorized = time.perf_counter()
+    probabilities = model.predict_proba(X)
+    scored = time.perf_counter()
+    explanations = explainer.explain(X, processed_texts, top_k)
+    if observer is not None:
+        observer('vectorize', vectorized - start)
+        observer('score', scored - vectorized)
+        observer('explain', time.perf_counter() - scored)
+    labels = np.asarray(model.classes_)[probabilities.argmax(axis=1)]
+    return labels, probabilities, explanations
+
+
+def format_prediction(label, probabilities):
+    """
+    Build the JSON-serializable prediction fields for one review.
+
+    Args:
+        label: Predicted class (0 or 1)
+        probabilities (array): Class probabilities [negative, positive]
+
+    Returns:
+        dict: sentiment, confidence, raw_prediction and probabilities
+    """
+    return {
+        'sentiment': SENTIMENT_LABELS[int(label)],
+        'confidence': round(float(probabilities.max()), 4),
+        'raw_prediction': int(label),
+        'probabilities': {
+            'negative': round(float(probabilities[0]), 4),
+            'positive': round(float(probabilities[1]), 4)
+        }
+    }
+
+
+def predict_batch(model, vectorizer, reviews, chunk_size=DEFAULT_CHUNK_SIZE, explainer=None, top_k=DEFAULT_TOP_K,
+                  echo=True):
+    """
+    Predict sentiment for a list of reviews with vectorized scoring.
+
+    Invalid items (non-strings, empty strings) are not scored but still get
+    an entry at their index, so the output always lines up with the input.
+    Repeated reviews are preprocessed once, and reviews of one chunk that
+    preprocess to the same text are scored once; their results are copied
+    to every index. Distinct reviews are preprocessed and scored chunk by
+    chunk, so at most chunk_size preprocessed texts are held at a time.
+
+    Args:
+        model: Fitted classifier exposing predict_proba and classes_
+        vectorizer: Fitted vectorizer
+        reviews (list): Raw review texts
+        chunk_size (int): Maximum number of distinct reviews preprocessed
+            and scored per call
+        explainer (explain.Explainer): If given, each result gets an
+            "explanation" with the top_k strongest n-grams per direction
+        top_k (int): N-grams reported per direction
+        echo (bool): Include each "original_review" in its result
+
+    Returns:
+        list: One result dict per input item, in input order
+    """
+    results = [None] * len(reviews)
+    first_index = {}
+    repeats = []
+
+    for i, review in enumerate(reviews):
+        if not is_valid_review(review):
+            results[i] = {
+                'index': i,
+                'original_review': review if isinstance(review, str) else None,
+                'skipped': True,
+                'error': 'Review must be a non-empty string'
+            }
+            if not echo:
+                del results[i]['original_review']
+        elif review in first_index:
+            repeats.append((i, first_index[review]))
+        else:
+            first_index[review] = i
+
+    # Token-level featurizers take the preprocessing tokens without a join and re-split
+    preprocess = preprocess_tokens if hasattr(vectorizer, 'transform_tokens') else preprocess_text
+    for indices in iter_chunks(list(first_index.values()), chunk_size):
+        distinct, row_of_key, rows = [], {}, []
+        for i in indices:
+            processed = preprocess(reviews[i])
+            key = ' '.join(processed) if isinstance(processed, list) else processed
+            if key not in row_of_key:
+                row_of_key[key] = len(distinct)
+                distinct.append(processed)
+            rows.append(row_of_key[key])
+
+        if explainer is None:
+            labels, probabilities = score_processed(model, vectorizer, distinct)
+            explanations = [None] * len(distinct)
+        else:
+            labels, probabilities, explanations = score_and_explain(model, vectorizer, distinct, explainer, top_k)
+        predictions = []
+        for label, proba, explanation in zip(labels, probabilities, explanations):
+            prediction = format_prediction(label, proba)
+            if explanation is not None:
+                prediction['explanation'] = explanation
+            predictions.append(prediction)
+
+        for i, row in zip(indices, rows):
+            results[i] = {'index': i, 'original_review': reviews[i], **predictions[row]} if echo else \
+                {'index': i, **predictions[row]}
+    for i, first in repeats:
+        results[i] = {**results[first], 'index': i}
+
+    return results
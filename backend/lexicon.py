@@ -0,0 +1,229 @@
+"""
+Bundled Lexical Resources
+=========================
+Local copies of the NLTK data used by preprocessing, so the server can start
+without nltk_data, network access or importing NLTK:
+
+    resources/
+        stopwords_english.txt   NLTK English stopword list, one word per line
+        wordnet_nouns.txt.gz    WordNet noun lemmas and noun exception list
+
+CompactLemmatizer reproduces WordNetLemmatizer.lemmatize(word) (pos 'n',
+as used by preprocess.py) from wordnet_nouns.txt.gz alone. The file is
+generated from an installed WordNet and checked against NLTK word by word:
+
+    python lexicon.py --export
+"""
+
+import os
+import gzip
+import argparse
+
+RESOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+STOPWORDS_FILE = 'stopwords_english.txt'
+LEMMA_FILE = 'wordnet_nouns.txt.gz'
+LEMMA_FORMAT = 'restro-wordnet-nouns 1'
+
+# WordNet's morphological rules for nouns (nltk WordNetCorpusReader.MORPHOLOGICAL_SUBSTITUTIONS)
+NOUN_SUBSTITUTIONS = (('s', ''), ('ses', 's'), ('ves', 'f'), ('xes', 'x'), ('zes', 'z'),
+                      ('ches', 'ch'), ('shes', 'sh'), ('men', 'man'), ('ies', 'y'))
+
+
+def load_stopwords(directory=RESOURCE_DIR):
+    """
+    Read the bundled English stopword list.
+
+    Args:
+        directory (str): Resource directory
+
+    Returns:
+        list: Stopwords in file order, or None if the file is missing
+    """
+    path = os.path.join(directory, STOPWORDS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class CompactLemmatizer:
+    """
+    Noun lemmatizer equivalent to nltk's WordNetLemmatizer for pos 'n'.
+
+    Args:
+        lemmas (set): WordNet noun lemmas
+        exceptions (dict): Irregular form -> list of lemmas (noun.exc)
+        repeat_rules (bool): Keep applying the suffix rules until a lemma is
+            found, as NLTK releases before 3.9 do; newer releases apply them once
+        source (str): Where the data came from, e.g. 'nltk=3.8.1 repeat_rules'
+    """
+
+    def __init__(self, lemmas, exceptions, repeat_rules=False, source=None):
+        self.lemmas = lemmas
+        self.exceptions = exceptions
+        self.repeat_rules = repeat_rules
+        self.source = source
+
+    @staticmethod
+    def _apply_rules(forms):
+        return [form[:-len(old)] + new for form in forms for old, new in NOUN_SUBSTITUTIONS if form.endswith(old)]
+
+    def _filter(self, forms):
+        result = []
+        for form in forms:
+            if form in self.lemmas and form not in result:
+                result.append(form)
+        return result
+
+    def morphy(self, form):
+        """
+        Find the noun lemmas of a word form.
+
+        Returns:
+            list: Candidate lemmas, possibly empty
+        """
+        if form in self.exceptions:
+            return self._filter([form] + self.exceptions[form])
+        forms = self._apply_rules([form])
+        results = self._filter([form] + forms)
+        if results or not self.repeat_rules:
+            return results
+        while forms:
+            forms = self._apply_rules(forms)
+            results = self._filter(forms)
+            if results:
+                return results
+        return []
+
+    def lemmatize(self, word, pos='n'):
+        """
+        Return the shortest noun lemma of a word, or the word itself.
+
+        Raises:
+            ValueError: For parts of speech other than nouns
+        """
+        if pos != 'n':
+            raise ValueError(f"CompactLemmatizer only covers nouns, not pos {pos!r}")
+        lemmas = self.morphy(word)
+        return min(lemmas, key=len) if lemmas else word
+
+
+def load_lemmatizer(directory=RESOURCE_DIR):
+    """
+    Load the bundled noun lemma data.
+
+    Args:
+        directory (str): Resource directory
+
+    Returns:
+        CompactLemmatizer: Lemmatizer, or None if the file is missing
+
+    Raises:
+        ValueError: If the file has an unknown format
+    """
+    path = os.path.join(directory, LEMMA_FILE)
+    if not os.path.exists(path):
+        return None
+    lemmas, exceptions, repeat_rules = set(), {}, False
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = f.readline().split()
+        if ' '.join(header[:2]) != LEMMA_FORMAT:
+            raise ValueError(f"Unknown lemma data format in {path}")
+        repeat_rules = 'repeat_rules' in header[2:]
+        source = ' '.join(header[2:])
+        for line in f:
+            form, _, lemma_list = line.rstrip('\n').partition('\t')
+            if lemma_list:
+                exceptions[form] = lemma_list.split(' ')
+            else:
+                lemmas.add(form)
+    return CompactLemmatizer(lemmas, exceptions, repeat_rules, source)
+
+
+def verification_words(lemmas, exceptions):
+    # Every lemma and irregular form, plus regular inflections the suffix rules undo
+    words = set(lemmas) | set(exceptions)
+    for lemma in lemmas:
+        words.update((lemma + 's', lemma + 'es', lemma + 'ses'))
+        if lemma.endswith('y'):
+            words.add(lemma[:-1] + 'ies')
+        if lemma.endswith('f'):
+            words.add(lemma[:-1] + 'ves')
+        if lemma.endswith('man'):
+            words.add(lemma[:-3] + 'men')
+    return sorted(words)
+
+
+def export_resources(directory=RESOURCE_DIR, verify=True):
+    """
+    Write the bundled resources from the installed NLTK data.
+
+    The suffix-rule variant matching the installed NLTK is selected by
+    comparing both against WordNetLemmatizer, and the export is refused if
+    neither reproduces it on every verification word.
+
+    Args:
+        directory (str): Resource directory to write
+        verify (bool): Check the compact lemmatizer against NLTK
+
+    Returns:
+        dict: Counts of stopwords, lemmas and exceptions written
+
+    Raises:
+        ValueError: If the compact lemmatizer does not match NLTK
+    """
+    import nltk
+    from nltk.corpus import stopwords, wordnet
+    from nltk.stem import WordNetLemmatizer
+
+    words = stopwords.words('english')
+    lemmas = {lemma for lemma, pos_map in wordnet._lemma_pos_offset_map.items() if 'n' in pos_map}
+    exceptions = {form: list(lemma_list) for form, lemma_list in wordnet._exception_map['n'].items()}
+
+    repeat_rules = False
+    if verify:
+        reference = WordNetLemmatizer()
+        checked = verification_words(lemmas, exceptions)
+        expected = [reference.lemmatize(word) for word in checked]
+        for repeat_rules in (False, True):
+            compact = CompactLemmatizer(lemmas, exceptions, repeat_rules)
+            mismatches = [w for w, e in zip(checked, expected) if compact.lemmatize(w) != e]
+            if not mismatches:
+                break
+        else:
+            raise ValueError(f"Compact lemmatizer differs from NLTK {nltk.__version__} on "
+                             f"{len(mismatches)} word(s), e.g. {mismatches[:5]}")
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, STOPWORDS_FILE), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(words) + '\n')
+    with gzip.open(os.path.join(directory, LEMMA_FILE), 'wt', encoding='utf-8', compresslevel=9) as f:
+        f.write(f"{LEMMA_FORMAT} nltk={nltk.__version__}" + (' repeat_rules' if repeat_rules else '') + '\n')
+        for form in sorted(exceptions):
+            if not exceptions[form]:
+                continue
+            f.write(f"{form}\t{' '.join(exceptions[form])}\n")
+        for lemma in sorted(lemmas):
+            f.write(lemma + '\n')
+    return {'stopwords': len(words), 'lemmas': len(lemmas), 'exceptions': len(exceptions)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the NLTK data used by preprocessing as local resources.')
+    parser.add_argument('--export', action='store_true', help='Write the resources from the installed NLTK data')
+    parser.add_argument('--directory', default=RESOURCE_DIR, help='Resource directory (default: %(default)s)')
+    parser.add_argument('--no-verify', action='store_true', help='Skip the check against WordNetLemmatizer')
+    args = parser.parse_args(argv)
+    if args.export:
+        counts = export_resources(args.directory, verify=not args.no_verify)
+        print(f"Wrote {counts['stopwords']} stopwords, {counts['lemmas']} noun lemmas and "
+              f"{counts['exceptions']} exceptions to {args.directory}")
+    else:
+        lemmatizer = load_lemmatizer(args.directory)
+        stop_words = load_stopwords(args.directory)
+        print(f"Stopwords: {len(stop_words) if stop_words else 'missing'}")
+        print(f"Noun lemmas: {len(lemmatizer.lemmas) if lemmatizer else 'missing (run with --export)'}")
+
+
+if __name__ == '__main__':
+    main()
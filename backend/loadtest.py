@@ -0,0 +1,498 @@
+"""
+Load Test Harness for Restaurant Sentiment Analysis
+Starts serve.py on a free localhost port (or targets --url), drives /predict and
+/batch_predict with open-loop Poisson arrivals and reports throughput, p50/p95/p99
+latency and error rates per time interval and per offered rate.
+
+Arrival times are drawn in advance and do not wait for responses, so a server that
+falls behind builds a backlog instead of slowing the client down. Latency is measured
+from each request's scheduled arrival, including time spent waiting for one of the
+--concurrency client connections. Passing several --rates steps the load up and
+reports the first rate the server could not sustain.
+
+By default there are as many client connections as the server has request threads
+(--workers x --threads). More connections only queue inside the server, so the
+excess is reported with a warning rather than silently measured as server latency.
+
+The client side uses only the standard library (http.client and threads), so the
+whole test runs offline on one Linux box. Results are saved as JSON; --report prints
+saved runs side by side to compare server modes (workers, threads, micro-batching).
+
+Usage:
+    python loadtest.py --workers 4 --threads 8 --rates 50 100 200 400 --output w4.json
+    python loadtest.py --workers 4 --server-env MICROBATCH_ENABLED=1 --rates 50 100 200 400 --output w4-mb.json
+    python loadtest.py --report w4.json w4-mb.json
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import queue
+import random
+import signal
+import logging
+import platform
+import argparse
+import threading
+import subprocess
+import collections
+import http.client
+from urllib.parse import urlsplit
+
+from synthetic import generate_corpus
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+logger = logging.getLogger('loadtest')
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = ('predict', 'batch_predict')
+SERVING_LINE = re.compile(r'Serving on http://[^\s:]+:(\d+)')
+
+
+def parse_mix(text):
+    # "predict=0.9,batch_predict=0.1" -> {'predict': 0.9, 'batch_predict': 0.1}
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r} in mix (expected {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight) if weight else 1.0
+    if sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("Request mix weights must add up to more than 0")
+    return mix
+
+
+def parse_env(items):
+    env = {}
+    for item in items or []:
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got {item!r}")
+        env[key] = value
+    return env
+
+
+def load_csv_corpus(path, text_col, n_reviews, seed=42):
+    import csv
+    with open(path, newline='', encoding='utf-8') as f:
+        texts = [row[text_col] for row in csv.DictReader(f) if row.get(text_col)]
+    random.Random(seed).shuffle(texts)
+    return texts[:n_reviews]
+
+
+def build_payloads(texts, mix, batch_size, n_payloads=2000, seed=42, echo=True, explain=False):
+    # Pre-encoded (endpoint, body, n_reviews) requests in the proportions of the mix, so the
+    # dispatcher only picks one per arrival.
+    rng = random.Random(seed)
+    endpoints, weights = zip(*mix.items())
+    payloads = []
+    for endpoint in rng.choices(endpoints, weights, k=n_payloads):
+        if endpoint == 'predict':
+            body = {'review': rng.choice(texts)}
+        else:
+            body = {'reviews': [rng.choice(texts) for _ in range(batch_size)]}
+            if not echo:
+                body['echo'] = False
+        if explain:
+            body['explain'] = True
+        payloads.append((endpoint, json.dumps(body).encode('utf-8'), 1 if endpoint == 'predict' else batch_size))
+    return payloads
+
+
+def process_group_cpu_seconds(pgid):
+    # User + system CPU time of every live process in a process group (serve.py and its
+    # forked workers), read from /proc. None where /proc is not available.
+    if not os.path.isdir('/proc'):
+        return None
+    ticks = 0
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                fields = f.read().rpartition(')')[2].split()
+        except OSError:
+            continue
+        if int(fields[2]) == pgid:
+            ticks += int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+class LocalServer:
+    # serve.py in its own process group on a free localhost port. The port is read from
+    # the "Serving on" line it prints; startup is complete once /health reports healthy.
+    def __init__(self, workers=1, threads=8, env=None, log_path=None):
+        self.workers = workers
+        self.threads = threads
+        self.env = env or {}
+        self.log_path = log_path
+        self.process = None
+        self.port = None
+        self.output = collections.deque(maxlen=50)
+
+    def _read_output(self):
+        log = open(self.log_path, 'w') if self.log_path else None
+        try:
+            for line in self.process.stdout:
+                self.output.append(line.rstrip())
+                if log:
+                    log.write(line)
+                    log.flush()
+                match = SERVING_LINE.search(line)
+                if match and self.port is None:
+                    self.port = int(match.group(1))
+        finally:
+            if log:
+                log.close()
+
+    def start(self, timeout=300.0):
+        # Offline by default: the server must not try to download NLTK data
+        env = {'NLTK_AUTO_DOWNLOAD': '0', **os.environ, **self.env, 'PYTHONUNBUFFERED': '1'}
+        cmd = [sys.executable, os.path.join(BACKEND_DIR, 'serve.py'), '--host', '127.0.0.1', '--port', '0',
+               '--workers', str(self.workers), '--threads', str(self.threads)]
+        logger.info(f"Starting {' '.join(cmd[1:])}" + (f" with {self.env}" if self.env else ""))
+        self.process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, text=True, start_new_session=True)
+        threading.Thread(target=self._read_output, name='server-output', daemon=True).start()
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"serve.py exited with status {self.process.returncode}:\n"
+                                   + '\n'.join(self.output))
+            if self.port is not None and self.health().get('status') == 'healthy':
+                logger.info(f"Server ready on port {self.port}")
+                return self
+            if time.monotonic() > deadline:
+                self.stop()
+                raise TimeoutError(f"serve.py was not healthy after {timeout:.0f}s:\n" + '\n'.join(self.output))
+            time.sleep(0.2)
+
+    def health(self):
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+            conn.request('GET', '/health')
+            response = conn.getresponse()
+            return json.loads(response.read())
+        except (OSError, http.client.HTTPException, ValueError):
+            return {}
+
+    def cpu_seconds(self):
+        return process_group_cpu_seconds(self.process.pid) if self.process else None
+
+    def stop(self, timeout=15.0):
+        if self.process is None or self.process.poll() is not None:
+            return
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(self.process.pid, sig)
+            except ProcessLookupError:
+                return
+            try:
+                self.process.wait(timeout)
+                return
+            except subprocess.TimeoutExpired:
+                logger.warning(f"serve.py did not stop after {timeout:.0f}s; killing it")
+
+
+def client_worker(host, port, jobs, records, headers, timeout, t0):
+    # One keep-alive connection; http.client reconnects by itself after the server closes it.
+    # Jobs that waited longer than the timeout for a connection are dropped as backlog.
+    conn = None
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        scheduled, (endpoint, body, n_reviews) = job
+        sent = time.perf_counter()
+        status, error = None, None
+        if sent - scheduled > timeout:
+            error = 'client_backlog'
+        else:
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+                conn.request('POST', '/' + endpoint, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+                if status >= 400:
+                    error = str(status)
+            except (OSError, http.client.HTTPException) as e:
+                error = 'timeout' if isinstance(e, TimeoutError) else type(e).__name__
+                if conn is not None:
+                    conn.close()
+                conn = None
+        done = time.perf_counter()
+        records.append((scheduled - t0, sent - scheduled, done - scheduled, endpoint, n_reviews, error))
+    if conn is not None:
+        conn.close()
+
+
+def run_stage(host, port, payloads, rate, duration, concurrency, headers, timeout=10.0, seed=0):
+    # Open-loop Poisson arrivals at `rate` requests/s for `duration` seconds.
+    # Returns (records, elapsed seconds until the last response).
+    rng = random.Random(seed)
+    jobs = queue.Queue()
+    records = []
+    t0 = time.perf_counter() + 0.05
+    threads = [threading.Thread(target=client_worker, args=(host, port, jobs, records, headers, timeout, t0),
+                                name=f'client-{i}', daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    arrival = t0
+    while True:
+        arrival += rng.expovariate(rate)
+        if arrival - t0 >= duration:
+            break
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        jobs.put((arrival, rng.choice(payloads)))
+    for _ in threads:
+        jobs.put(None)
+    for thread in threads:
+        thread.join()
+    return records, time.perf_counter() - t0
+
+
+def percentile(sorted_values, q):
+    # Nearest-rank percentile of an ascending list, in the list's units
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(records, elapsed):
+    latencies = sorted(latency for _, _, latency, _, _, error in records if error is None)
+    errors = collections.Counter(error for *_, error in records if error is not None)
+    ok = len(latencies)
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'requests': len(records),
+        'ok': ok,
+        'errors': sum(errors.values()),
+        'error_rate': round(sum(errors.values()) / len(records), 4) if records else 0.0,
+        'errors_by_kind': dict(errors),
+        'throughput_rps': round(ok / elapsed, 2) if elapsed > 0 else 0.0,
+        'reviews_per_second': round(sum(n for *_, n, error in records if error is None) / elapsed, 2)
+        if elapsed > 0 else 0.0,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1] if latencies else None),
+        'mean_wait_ms': ms(sum(wait for _, wait, *_ in records) / len(records) if records else None),
+    }
+
+
+def timeline(records, interval):
+    # Per-interval summary, bucketed by when each response completed
+    buckets = collections.defaultdict(list)
+    for record in records:
+        buckets[int((record[0] + record[2]) // interval)].append(record)
+    return [{'t': round(i * interval, 3), **summarize(buckets[i], interval)}
+            for i in range(max(buckets) + 1 if buckets else 0)]
+
+
+def find_saturation(stages, min_ratio, max_error_rate, slo_ms):
+    # First stage whose achieved throughput fell below min_ratio of its actual arrival rate
+    # (Poisson arrivals scatter around the offered rate), whose error rate exceeded
+    # max_error_rate, or whose p99 exceeded slo_ms.
+    sustained = None
+    for stage in stages:
+        summary = stage['summary']
+        reasons = []
+        if summary['throughput_rps'] < min_ratio * stage['arrival_rps']:
+            reasons.append(f"throughput {summary['throughput_rps']} < {min_ratio:.0%} of "
+                           f"{stage['arrival_rps']} arrivals/s")
+        if summary['error_rate'] > max_error_rate:
+            reasons.append(f"error rate {summary['error_rate']:.2%}")
+        if slo_ms and (summary['p99_ms'] is None or summary['p99_ms'] > slo_ms):
+            reasons.append(f"p99 {summary['p99_ms']} ms > {slo_ms} ms")
+        if reasons:
+            return {'saturated_at_rps': stage['offered_rps'], 'max_sustained_rps': sustained, 'reasons': reasons}
+        sustained = stage['offered_rps']
+    return {'saturated_at_rps': None, 'max_sustained_rps': sustained, 'reasons': []}
+
+
+def print_report(paths):
+    header = (f"{'run':<24} {'offered':>8} {'achieved':>9} {'reviews/s':>10} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'p99 ms':>9} {'errors':>7} {'cpu ms/req':>10}")
+    print(header)
+    print('-' * len(header))
+    for path in paths:
+        with open(path) as f:
+            report = json.load(f)
+        label = report['meta'].get('label') or os.path.basename(path)
+        for stage in report['stages']:
+            s = stage['summary']
+            cpu = stage.get('server_cpu_ms_per_request')
+
+            def fmt(value):
+                return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+            print(f"{label[:24]:<24} {stage['offered_rps']:>8g} {s['throughput_rps']:>9.1f} "
+                  f"{s['reviews_per_second']:>10.1f} {fmt(s['p50_ms'])} {fmt(s['p95_ms'])} {fmt(s['p99_ms'])} "
+                  f"{s['error_rate']:>7.2%} {cpu if cpu is not None else '-':>10}")
+        saturation = report.get('saturation') or {}
+        if saturation.get('saturated_at_rps') is not None:
+            print(f"{'':<24} saturated at {saturation['saturated_at_rps']:g} req/s: "
+                  f"{'; '.join(saturation['reasons'])}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Open-loop load test of /predict and /batch_predict.')
+    parser.add_argument('--report', nargs='+', metavar='RESULTS',
+                        help='Print saved results side by side instead of running a test')
+    parser.add_argument('--url', help='Test an already running server instead of starting serve.py')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='serve.py worker processes, or those of the --url server (default: 1)')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='serve.py threads per worker, or those of the --url server (default: 8)')
+    parser.add_argument('--server-env', action='append', metavar='KEY=VALUE',
+                        help='Environment variable for serve.py, e.g. MICROBATCH_ENABLED=1 (repeatable)')
+    parser.add_argument('--server-log', help='Write serve.py output to this file')
+    parser.add_argument('--startup-timeout', type=float, default=300.0,
+                        help='Seconds to wait for serve.py to become healthy')
+    parser.add_argument('--rates', type=float, nargs='+', default=[20.0],
+                        help='Offered request rates (req/s), one stage each, in order')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds per stage')
+    parser.add_argument('--warmup', type=float, default=3.0,
+                        help='Seconds of unrecorded load at the first rate before the stages')
+    parser.add_argument('--concurrency', type=int,
+                        help='Client connections, i.e. maximum requests in flight '
+                             '(default: --workers x --threads)')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('predict=0.9,batch_predict=0.1'),
+                        help='Request mix as endpoint=weight pairs (default: predict=0.9,batch_predict=0.1)')
+    parser.add_argument('--batch-size', type=int, default=32, help='Reviews per /batch_predict request')
+    parser.add_argument('--reviews', type=int, default=5000, help='Size of the review pool requests draw from')
+    parser.add_argument('--mean-sentences', type=float, default=5.0, help='Mean synthetic review length in sentences')
+    parser.add_argument('--length-sigma', type=float, default=0.6,
+                        help='Spread (log-normal sigma) of synthetic review lengths')
+    parser.add_argument('--corpus', help='CSV file to draw reviews from instead of the synthetic corpus')
+    parser.add_argument('--text-col', default='Review Text', help='Review column of --corpus')
+    parser.add_argument('--no-echo', action='store_true', help='Send "echo": false with /batch_predict requests')
+    parser.add_argument('--explain', action='store_true', help='Request explanations')
+    parser.add_argument('--gzip', action='store_true', help='Send Accept-Encoding: gzip')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout in seconds')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds per timeline bucket')
+    parser.add_argument('--min-throughput-ratio', type=float, default=0.95,
+                        help='A stage is saturated when it achieves less than this share of its arrival rate')
+    parser.add_argument('--max-error-rate', type=float, default=0.01,
+                        help='A stage is saturated above this error rate')
+    parser.add_argument('--slo-ms', type=float, help='A stage is saturated when p99 latency exceeds this')
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the corpus, request mix and arrivals')
+    parser.add_argument('--label', help='Name of this run in --report output (default: file name)')
+    parser.add_argument('--output', default='loadtest_results.json', help='Results file (default: %(default)s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.report:
+        print_report(args.report)
+        return
+
+    if args.corpus:
+        texts = load_csv_corpus(args.corpus, args.text_col, args.reviews, seed=args.seed)
+    else:
+        texts = generate_corpus(args.reviews, seed=args.seed, mean_sentences=args.mean_sentences,
+                                sigma=args.length_sigma)
+    payloads = build_payloads(texts, args.mix, args.batch_size, seed=args.seed, echo=not args.no_echo,
+                              explain=args.explain)
+    headers = {'Content-Type': 'application/json'}
+    if args.gzip:
+        headers['Accept-Encoding'] = 'gzip'
+
+    server_threads = args.workers * args.threads
+    if args.concurrency is None:
+        args.concurrency = server_threads
+    elif args.concurrency > server_threads:
+        logger.warning(f"--concurrency {args.concurrency} exceeds the server's {server_threads} request threads "
+                       f"(--workers x --threads); the excess requests queue inside the server")
+
+    server = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        server = LocalServer(args.workers, args.threads, parse_env(args.server_env), args.server_log)
+        server.start(args.startup_timeout)
+        host, port = '127.0.0.1', server.port
+
+    stages = []
+    try:
+        if args.warmup > 0:
+            logger.info(f"Warm-up: {args.warmup:g}s at {args.rates[0]:g} req/s...")
+            run_stage(host, port, payloads, args.rates[0], args.warmup, args.concurrency, headers,
+                      timeout=args.timeout, seed=args.seed - 1)
+        for i, rate in enumerate(args.rates):
+            logger.info(f"Stage {i + 1}/{len(args.rates)}: {rate:g} req/s for {args.duration:g}s...")
+            cpu_before = server.cpu_seconds() if server else None
+            records, elapsed = run_stage(host, port, payloads, rate, args.duration, args.concurrency, headers,
+                                         timeout=args.timeout, seed=args.seed + i)
+            cpu_after = server.cpu_seconds() if server else None
+            summary = summarize(records, elapsed)
+            stage = {
+                'offered_rps': rate,
+                'arrival_rps': round(len(records) / args.duration, 2),
+                'duration': args.duration,
+                'elapsed': round(elapsed, 3),
+                'summary': summary,
+                'endpoints': {endpoint: summarize([r for r in records if r[3] == endpoint], elapsed)
+                              for endpoint in args.mix},
+                'timeline': timeline(records, args.interval),
+            }
+            if cpu_before is not None and cpu_after is not None:
+                stage['server_cpu_seconds'] = round(cpu_after - cpu_before, 3)
+                stage['server_cpu_ms_per_request'] = round((cpu_after - cpu_before) * 1000 / max(summary['ok'], 1), 3)
+            stages.append(stage)
+            logger.info(f"  {summary['throughput_rps']:.1f} req/s ({summary['reviews_per_second']:.1f} reviews/s), "
+                        f"p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms, "
+                        f"errors {summary['error_rate']:.2%}")
+    finally:
+        if server:
+            server.stop()
+
+    saturation = find_saturation(stages, args.min_throughput_ratio, args.max_error_rate, args.slo_ms)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'label': args.label,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'server': {'url': args.url} if args.url else
+                      {'workers': args.workers, 'threads': args.threads, 'env': parse_env(args.server_env)},
+            'mix': args.mix,
+            'batch_size': args.batch_size,
+            'concurrency': args.concurrency,
+            'corpus': args.corpus or 'synthetic',
+            'mean_chars': round(sum(len(t) for t in texts) / len(texts), 1),
+            'echo': not args.no_echo,
+            'explain': args.explain,
+            'gzip': args.gzip,
+            'seed': args.seed,
+        },
+        'stages': stages,
+        'saturation': saturation,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Wrote results to {args.output}")
+    if saturation['saturated_at_rps'] is not None:
+        logger.info(f"Saturated at {saturation['saturated_at_rps']:g} req/s ({'; '.join(saturation['reasons'])}); "
+                    f"highest sustained rate: {saturation['max_sustained_rps']}")
+    else:
+        logger.info(f"No saturation up to {args.rates[-1]:g} req/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""
+In-Process Metrics with Prometheus Text Exposition
+===================================================
+Minimal thread-safe counters, gauges and histograms rendered in the
+Prometheus text format (version 0.0.4) for the /metrics endpoint.
+
+Recording a value is a dict lookup and a few additions under a lock, cheap
+enough for the request hot path. Metrics live in the process that records
+them. Behind a pre-fork server, MetricsRegistry.share(directory) makes every
+worker write its values to its own file there, once per flush interval and
+before every render, and /metrics on any worker renders the combined values:
+counters and histograms are summed over all files, gauges of the live
+workers combined as configured per gauge. Files of exited workers are kept,
+so totals never go down when a worker is replaced.
+"""
+
+import os
+import glob
+import json
+import time
+import bisect
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans sub-millisecond preprocessing steps up to slow batch requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Items per batch
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class holding one value per combination of label values."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def snapshot(self):
+        """
+        Copy the recorded values in a JSON-serializable form.
+
+        Returns:
+            list: [label values, value] pairs
+        """
+        with self._lock:
+            return [[list(key), json.loads(json.dumps(value))] for key, value in self._values.items()]
+
+    def _merge(self, values):
+        # Combine one label combination's values from several processes
+        return sum(values)
+
+    def clear(self):
+        """Drop all recorded label combinations."""
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        """
+        Render the metric in the text exposition format.
+
+        Returns:
+            list: Lines including the HELP and TYPE headers
+        """
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._render(items)
+
+    def render_merged(self, snapshots):
+        """
+        Render the combined values of several processes.
+
+        Args:
+            snapshots (list): snapshot() results, one per process
+
+        Returns:
+            list: Lines including the HELP and TYPE headers
+        """
+        grouped = {}
+        for snapshot in snapshots:
+            for key, value in snapshot:
+                grouped.setdefault(tuple(key), []).append(value)
+        return self._render(sorted((key, self._merge(values)) for key, values in grouped.items()))
+
+    def _render(self, items):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in items]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. requests served."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """Set the count directly, for counts kept elsewhere; it must never decrease."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, e.g. model load time.
+
+    Args:
+        merge (str): How values of several processes are combined, 'max'
+            (e.g. a setting or load time) or 'sum' (e.g. a queue depth)
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), merge='max'):
+        super().__init__(name, documentation, labelnames)
+        if merge not in ('max', 'sum'):
+            raise ValueError(f"Unknown gauge merge: {merge}")
+        self.merge = merge
+
+    def _merge(self, values):
+        return max(values) if self.merge == 'max' else sum(values)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets.
+
+    Args:
+        buckets (tuple): Sorted upper bounds; +Inf is added automatically
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _merge(self, values):
+        counts = [sum(bucket) for bucket in zip(*(value[0] for value in values))]
+        return [counts, sum(value[1] for value in values), sum(value[2] for value in values)]
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together on /metrics.
+
+    Attributes:
+        directory (str): Directory shared by the worker processes, or None
+            when each process reports only its own values
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self.directory = None
+        self._parent_pid = None
+        self._flusher_pid = None
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), merge='max'):
+        return self._register(Gauge(name, documentation, labelnames, merge))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, collect):
+        """
+        Register a callable run before each render and flush, to copy values
+        kept elsewhere (e.g. the micro-batcher's counters) into metrics.
+        """
+        self._collectors.append(collect)
+        return collect
+
+    def _collect(self):
+        for collect in self._collectors:
+            collect()
+
+    def share(self, directory):
+        """
+        Combine the values of all processes through files in a directory.
+
+        Called in the parent before forking. The parent's values so far are
+        written to its own file, so workers can start from zero.
+
+        Args:
+            directory (str): Existing directory; stale metrics-*.json files
+                from an earlier server are removed
+        """
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            os.remove(path)
+        self.directory = directory
+        self._parent_pid = self._flusher_pid = os.getpid()
+        self.flush()
+
+    def flush(self):
+        """Write this process's values to its file in the shared directory."""
+        if self.directory is None:
+            return
+        self._collect()
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        snapshot = {metric.name: metric.snapshot() for metric in self._metrics}
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    def start_flusher(self, interval=1.0):
+        """
+        Start flushing this process's values every interval seconds.
+
+        Called once in each forked worker. Counters and histograms inherited
+        from the parent are dropped first: they are already in its file.
+
+        Args:
+            interval (float): Seconds between flushes
+        """
+        if self.directory is None or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        for metric in self._metrics:
+            if not isinstance(metric, Gauge):
+                metric.clear()
+
+        def flush_periodically():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"Metrics flush failed: {str(e)}")
+
+        threading.Thread(target=flush_periodically, name='metrics-flusher', daemon=True).start()
+
+    def _read_snapshots(self):
+        # pid -> snapshot of every process that has flushed
+        snapshots = {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    snapshots[int(os.path.basename(path)[len('metrics-'):-len('.json')])] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def _is_worker_alive(self, pid):
+        # The parent serves no requests; its gauges hold pre-fork values the workers inherited
+        if pid == self._parent_pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def render(self):
+        """
+        Render every registered metric, combined over all processes when shared.
+
+        Returns:
+            str: Text exposition body
+        """
+        lines = []
+        if self.directory is None:
+            self._collect()
+            for metric in self._metrics:
+                lines.extend(metric.render())
+        else:
+            # Flushed first, so no process's values are older than in the previous render
+            self.flush()
+            snapshots = self._read_snapshots()
+            live = {pid: snapshot for pid, snapshot in snapshots.items() if self._is_worker_alive(pid)}
+            for metric in self._metrics:
+                sources = live if isinstance(metric, Gauge) else snapshots
+                lines.extend(metric.render_merged([snapshot.get(metric.name, []) for snapshot in sources.values()]))
+        return '\n'.join(lines) + '\n'
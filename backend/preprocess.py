@@ -4,30 +4,34 @@ Text Preprocessing Module for Sentiment Analysis
 Handles cleaning and preprocessing of restaurant reviews for both training and prediction.
 """
 
+import os
 import re
+import time
 import string
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+import hashlib
+import functools
+import threading
+from importlib import metadata
+from concurrent.futures import ProcessPoolExecutor
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+from cache import LRUCache
+from lexicon import load_stopwords, load_lemmatizer
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+# NLTK is imported on first use, not at import time: the stopwords and noun
+# lemmas come from the bundled resources (see lexicon.py), and the tokenizer
+# (which needs no NLTK data) is only used for non-ASCII text. Without the
+# bundled resources, the NLTK corpora must be installed; they are only
+# downloaded with NLTK_AUTO_DOWNLOAD=1, never by default.
+NLTK_AUTO_DOWNLOAD = os.environ.get('NLTK_AUTO_DOWNLOAD', '0').lower() in ('1', 'true', 'yes')
 
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
+# Lemmatizer, created on first use by get_lemmatizer()
+lemmatizer = None
+_word_tokenize = None
+_resource_lock = threading.Lock()
 
-# Initialize lemmatizer and stopwords
-lemmatizer = WordNetLemmatizer()
+# Token -> lemma cache; restaurant vocabulary is highly repetitive
+LEMMA_CACHE_SIZE = int(os.environ.get('LEMMA_CACHE_SIZE', 50000))
+lemma_cache = LRUCache(LEMMA_CACHE_SIZE)
 
 # Important: Remove negation words from stopwords for sentiment analysis
 # Words like 'not', 'no', 'nor', 'neither' are critical for detecting negative sentiment
@@ -36,10 +40,104 @@ negation_words = {'not', 'no', 'nor', 'neither', 'never', 'nobody', 'nothing', '
                   'shan', 'shouldn', 'couldn', 'mustn', 'mightn', 'don', 'didn', 'doesn',
                   'isn', 'ain', 'doesn'}
 
-# Get English stopwords and remove negation words
-all_stopwords = set(stopwords.words('english'))
+
+def ensure_nltk_resource(resource, package):
+    """
+    Make sure an NLTK data resource is installed.
+    
+    Args:
+        resource (str): Resource path, e.g. 'corpora/wordnet'
+        package (str): Package to download if it is missing
+        
+    Raises:
+        LookupError: If it is missing and NLTK_AUTO_DOWNLOAD is off
+    """
+    import nltk
+    try:
+        nltk.data.find(resource)
+    except LookupError:
+        if not NLTK_AUTO_DOWNLOAD:
+            raise
+        nltk.download(package)
+
+
+def _nltk_stopwords():
+    ensure_nltk_resource('corpora/stopwords', 'stopwords')
+    from nltk.corpus import stopwords
+    return stopwords.words('english')
+
+
+def get_lemmatizer():
+    """
+    Return the lemmatizer, creating it on first use.
+    
+    Uses the bundled noun lemma data (lexicon.CompactLemmatizer) when
+    present, which gives the same lemmas without importing NLTK or loading
+    WordNet; otherwise NLTK's WordNetLemmatizer.
+    
+    Returns:
+        object: Lemmatizer with a lemmatize(word) method
+    """
+    global lemmatizer
+    if lemmatizer is None:
+        with _resource_lock:
+            if lemmatizer is None:
+                compact = load_lemmatizer()
+                if compact is None:
+                    ensure_nltk_resource('corpora/wordnet', 'wordnet')
+                    from nltk.stem import WordNetLemmatizer
+                    compact = WordNetLemmatizer()
+                lemmatizer = compact
+    return lemmatizer
+
+
+def lemmatizer_name():
+    """
+    Describe the active lemmatizer, e.g. for logs and the pipeline fingerprint.
+    
+    Returns:
+        str: 'WordNetLemmatizer', or 'CompactLemmatizer' with the NLTK
+        release its data was exported from
+    """
+    active = get_lemmatizer()
+    name = type(active).__name__
+    source = getattr(active, 'source', None)
+    return f'{name}({source})' if source else name
+
+
+# Get English stopwords (bundled copy, else the NLTK corpus) and remove negation words
+all_stopwords = set(load_stopwords() or _nltk_stopwords())
 stop_words = all_stopwords - negation_words
 
+# Precompiled patterns and translate tables shared by every call
+HTML_TAG_PATTERN = re.compile(r'<.*?>')
+URL_PATTERN = re.compile(r'https?://\S+|www\.\S+')
+NUMBER_PATTERN = re.compile(r'\d+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+# For ASCII text, digits and punctuation can be dropped in one translate pass
+ASCII_CLEANUP_TABLE = str.maketrans('', '', string.punctuation + string.digits)
+
+# Once punctuation is gone, the only tokens nltk.word_tokenize still splits in
+# ASCII text are these contractions (Treebank CONTRACTIONS2 rules)
+SPLIT_CONTRACTIONS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na'),
+}
+
+# Optional callable(stage, seconds) receiving the sub-step timings of
+# preprocess_text_fast; None (the default) skips timing entirely
+stage_observer = None
+
+# Bump whenever a rule changes in a way the fingerprint below cannot see
+# (e.g. a new step), so cached preprocessed corpora are invalidated
+PIPELINE_VERSION = 1
+
 
 def remove_html_tags(text):
     """
@@ -51,8 +149,7 @@ def remove_html_tags(text):
     Returns:
         str: Text without HTML tags
     """
-    html_pattern = re.compile(r'<.*?>')
-    return html_pattern.sub(r'', text)
+    return HTML_TAG_PATTERN.sub('', text)
 
 
 def remove_urls(text):
@@ -65,8 +162,7 @@ def remove_urls(text):
     Returns:
         str: Text without URLs
     """
-    url_pattern = re.compile(r'https?://\S+|www\.\S+')
-    return url_pattern.sub(r'', text)
+    return URL_PATTERN.sub('', text)
 
 
 def convert_to_lowercase(text):
@@ -93,15 +189,20 @@ def remove_punctuation_numbers(text):
         str: Text without punctuation and numbers
     """
     # Remove numbers
-    text = re.sub(r'\d+', '', text)
+    text = NUMBER_PATTERN.sub('', text)
     # Remove punctuation
-    text = text.translate(str.maketrans('', '', string.punctuation))
+    text = text.translate(PUNCTUATION_TABLE)
     return text
 
 
 def tokenize_text(text):
     """
-    Tokenize text into words.
+    Tokenize text into words with NLTK's Treebank word tokenizer.
+    
+    The text is not split into sentences first (preserve_line), so no Punkt
+    data is needed. Callers pass text with punctuation already removed, in
+    which Punkt finds no sentence boundary ('.', '?', '!'), so the tokens
+    are the same as word_tokenize's.
     
     Args:
         text (str): Text to tokenize
@@ -109,7 +210,37 @@ def tokenize_text(text):
     Returns:
         list: List of tokens (words)
     """
-    return nltk.word_tokenize(text)
+    global _word_tokenize
+    if _word_tokenize is None:
+        _word_tokenize = _load_word_tokenize()
+    return _word_tokenize(text)
+
+
+def _load_word_tokenize():
+    from nltk.tokenize import word_tokenize
+    return functools.partial(word_tokenize, preserve_line=True)
+
+
+def split_tokens_fast(text):
+    """
+    Tokenize cleaned ASCII text without the Punkt/Treebank tokenizer.
+    
+    Only valid for lowercase ASCII text that has already had punctuation
+    and numbers removed; for such text the result equals tokenize_text.
+    
+    Args:
+        text (str): Cleaned ASCII text
+        
+    Returns:
+        list: List of tokens (words)
+    """
+    tokens = text.split()
+    if SPLIT_CONTRACTIONS.keys().isdisjoint(tokens):
+        return tokens
+    split = []
+    for token in tokens:
+        split.extend(SPLIT_CONTRACTIONS.get(token, (token,)))
+    return split
 
 
 def remove_stopwords(tokens):
@@ -135,10 +266,159 @@ def lemmatize_tokens(tokens):
     Returns:
         list: Lemmatized tokens
     """
-    return [lemmatizer.lemmatize(token) for token in tokens]
+    return [lemmatize_token(token) for token in tokens]
+
+
+def lemmatize_token(token):
+    """
+    Lemmatize a single token, using the bounded LRU lemma cache.
+    
+    Args:
+        token (str): Token to lemmatize
+        
+    Returns:
+        str: Lemma
+    """
+    lemma = lemma_cache.get(token)
+    if lemma is None:
+        lemma = (lemmatizer or get_lemmatizer()).lemmatize(token)
+        lemma_cache.put(token, lemma)
+    return lemma
 
 
-def preprocess_text(text):
+def clean_and_tokenize(text):
+    """
+    Reference cleanup and tokenization (steps 3-5 of preprocess_text).
+    
+    Args:
+        text (str): Text with HTML tags and URLs already removed
+        
+    Returns:
+        list: List of tokens (words)
+    """
+    # Convert to lowercase
+    text = convert_to_lowercase(text)
+    
+    # Remove punctuation and numbers
+    text = remove_punctuation_numbers(text)
+    
+    # Extra spaces cleanup
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
+    
+    # Tokenize
+    return tokenize_text(text)
+
+
+def preprocess_text_reference(text):
+    """
+    Reference preprocessing pipeline, one full pass per step.
+    
+    Kept to validate preprocess_text_fast against; see verify_fast_pipeline.
+    
+    Args:
+        text (str): Raw text to preprocess
+        
+    Returns:
+        str: Cleaned and preprocessed text
+    """
+    text = remove_urls(remove_html_tags(text))
+    tokens = clean_and_tokenize(text)
+    tokens = remove_stopwords(tokens)
+    tokens = lemmatize_tokens(tokens)
+    return ' '.join(tokens)
+
+
+def preprocess_tokens(text):
+    """
+    Fused preprocessing pipeline returning the final tokens.
+    
+    After HTML and URL removal, ASCII text is lowercased, stripped of digits
+    and punctuation with a single translate call and split on whitespace;
+    stopword removal and lemmatization run in one pass over the tokens.
+    Non-ASCII text falls back to the reference cleanup and NLTK tokenizer,
+    since Unicode digits and punctuation need the regex and Treebank rules.
+    
+    Hashed featurizers (see features.py) consume these tokens directly
+    instead of re-tokenizing the joined text.
+    
+    With a stage observer set (see set_stage_observer), the duration of
+    each sub-step is reported to it.
+    
+    Args:
+        text (str): Raw text to preprocess
+        
+    Returns:
+        list: Preprocessed tokens
+    """
+    # Sub-step timings are only taken when an observer is set
+    observer = stage_observer
+    if observer is not None:
+        start = time.perf_counter()
+    
+    text = URL_PATTERN.sub('', HTML_TAG_PATTERN.sub('', text))
+    if observer is not None:
+        stripped = time.perf_counter()
+        observer('html_strip', stripped - start)
+    
+    if text.isascii():
+        tokens = split_tokens_fast(text.lower().translate(ASCII_CLEANUP_TABLE))
+    else:
+        tokens = clean_and_tokenize(text)
+    if observer is not None:
+        tokenized = time.perf_counter()
+        observer('tokenize', tokenized - stripped)
+    
+    tokens = [lemmatize_token(token) for token in tokens if token not in stop_words]
+    if observer is not None:
+        observer('lemmatize', time.perf_counter() - tokenized)
+    return tokens
+
+
+def preprocess_text_fast(text):
+    """
+    Fused preprocessing pipeline producing the same output as the reference.
+    
+    Args:
+        text (str): Raw text to preprocess
+        
+    Returns:
+        str: Cleaned and preprocessed text (see preprocess_tokens)
+    """
+    return ' '.join(preprocess_tokens(text))
+
+
+def set_stage_observer(observer):
+    """
+    Report sub-step timings of the fast pipeline, e.g. to latency metrics.
+    
+    Args:
+        observer (callable): Called as observer(stage, seconds) for the
+            'html_strip', 'tokenize' and 'lemmatize' steps; None disables it
+    """
+    global stage_observer
+    stage_observer = observer
+
+
+def verify_fast_pipeline(texts):
+    """
+    Compare the fast pipeline against the reference on a corpus.
+    
+    Args:
+        texts (iterable): Raw texts, e.g. a held-out sample of reviews
+        
+    Returns:
+        list: (text, reference_output, fast_output) for every mismatch
+    """
+    mismatches = []
+    for text in texts:
+        expected = preprocess_text_reference(text)
+        actual = preprocess_text_fast(text)
+        if actual != expected:
+            mismatches.append((text, expected, actual))
+    return mismatches
+
+
+def preprocess_text(text, fast=True):
     """
     Complete preprocessing pipeline for text.
     
@@ -154,35 +434,126 @@ def preprocess_text(text):
     
     Args:
         text (str): Raw text to preprocess
+        fast (bool): Use the fused pipeline (preprocess_text_fast), which
+            gives identical output; False runs the step-by-step reference
         
     Returns:
         str: Cleaned and preprocessed text
     """
-    # Remove HTML tags
-    text = remove_html_tags(text)
+    if fast:
+        return preprocess_text_fast(text)
+    return preprocess_text_reference(text)
+
+
+def pipeline_fingerprint():
+    """
+    Compute a fingerprint of the preprocessing rules and stopword set.
     
-    # Remove URLs
-    text = remove_urls(text)
+    Preprocessed texts cached under one fingerprint are only valid for
+    the exact same rules; any change yields a different fingerprint. The
+    active lemmatizer is part of it, since the bundled lemma data and
+    NLTK's WordNet are interchangeable only if the export matched.
     
-    # Convert to lowercase
-    text = convert_to_lowercase(text)
+    Returns:
+        str: 16 hex digit fingerprint
+    """
+    parts = [
+        f'version={PIPELINE_VERSION}',
+        f'nltk={metadata.version("nltk")}',
+        f'lemmatizer={lemmatizer_name()}',
+        HTML_TAG_PATTERN.pattern,
+        URL_PATTERN.pattern,
+        NUMBER_PATTERN.pattern,
+        WHITESPACE_PATTERN.pattern,
+        string.punctuation,
+        repr(sorted(SPLIT_CONTRACTIONS.items())),
+        ' '.join(sorted(stop_words)),
+    ]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def warm_up(tokenizer=False):
+    """
+    Force lazily loaded resources to load.
     
-    # Remove punctuation and numbers
-    text = remove_punctuation_numbers(text)
+    Called once per worker process, or in a background thread at server
+    startup, so the first real request or chunk is not slowed down by
+    loading the lemmatizer. NLTK is only imported with tokenizer=True
+    (otherwise the first non-ASCII review imports it).
     
-    # Extra spaces cleanup
-    text = re.sub(r'\s+', ' ', text).strip()
+    Args:
+        tokenizer (bool): Also load NLTK's tokenizer for non-ASCII text
+    """
+    get_lemmatizer()
+    preprocess_text('The waiters were serving dishes')
+    if tokenizer:
+        preprocess_text_reference('The waiters were serving dishes \u2014 caf\u00e9')
+
+
+def _preprocess_chunk(texts):
+    """Preprocess one chunk of texts inside a worker process."""
+    return [preprocess_text(text) for text in texts]
+
+
+def create_preprocess_pool(workers):
+    """
+    Create a process pool whose workers have NLTK warmed up.
     
-    # Tokenize
-    tokens = tokenize_text(text)
+    Reuse one pool across many preprocess_many calls to avoid starting
+    new worker processes for every chunk of a long job.
     
-    # Remove stopwords
-    tokens = remove_stopwords(tokens)
+    Args:
+        workers (int): Number of worker processes
+        
+    Returns:
+        ProcessPoolExecutor: The pool (caller is responsible for shutdown)
+    """
+    return ProcessPoolExecutor(max_workers=workers, initializer=warm_up)
+
+
+def preprocess_many(texts, workers=1, chunk_size=10000, progress=None, executor=None):
+    """
+    Preprocess many texts, optionally across a pool of worker processes.
     
-    # Lemmatize
-    tokens = lemmatize_tokens(tokens)
+    Texts are split into chunks that are fanned out to the workers; results
+    are gathered in the original order, so the output is identical to
+    [preprocess_text(t) for t in texts] regardless of the worker count.
+    
+    Args:
+        texts (list): Raw texts
+        workers (int): Number of worker processes (1 runs in-process)
+        chunk_size (int): Number of texts sent to a worker at a time
+        progress (callable): Optional progress(done, total) callback,
+            called after each chunk
+        executor (ProcessPoolExecutor): Existing pool to use instead of
+            starting one (see create_preprocess_pool); overrides workers
+        
+    Returns:
+        list: Preprocessed texts, in input order
+        
+    Raises:
+        ValueError: If chunk_size is less than 1
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    texts = list(texts)
+    total = len(texts)
+    chunks = [texts[start:start + chunk_size] for start in range(0, total, chunk_size)]
+    results = []
+    
+    if executor is None and (workers <= 1 or len(chunks) <= 1):
+        for chunk in chunks:
+            results.extend(_preprocess_chunk(chunk))
+            if progress is not None:
+                progress(len(results), total)
+        return results
     
-    # Reconstruct cleaned text
-    cleaned_text = ' '.join(tokens)
+    if executor is None:
+        with create_preprocess_pool(workers) as pool:
+            return preprocess_many(texts, chunk_size=chunk_size, progress=progress, executor=pool)
     
-    return cleaned_text
+    for processed in executor.map(_preprocess_chunk, chunks):
+        results.extend(processed)
+        if progress is not None:
+            progress(len(results), total)
+    return results
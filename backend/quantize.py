@@ -0,0 +1,203 @@
+"""
+Pruned and Quantized Model Export
+=================================
+Shrinks a trained model for low-memory serving. Features whose log-odds
+weight |a_k * w_kj| stays below a threshold in every fold are pruned, and
+the remaining fold weights are stored as float32, or as int8 with one scale
+factor per fold. The result is written as a mapped artifact (artifacts.py),
+which load_artifact, and so the API, serves like any other.
+
+For a TF-IDF vocabulary the pruned terms are removed and the kept columns
+renumbered, so the vocabulary table, IDF and weights all shrink. Pruned
+terms then no longer count towards the L2 norm of a review, which scales
+its remaining values slightly. Hashed featurizers cannot renumber their
+columns: only the kept weight rows are stored, plus a zero row and a table
+giving the row of every column, and norms are unchanged. The IDF is kept as
+float32 in both cases, and hashed document frequencies (only needed to
+update the IDF) are dropped.
+
+Both effects are measured by measure_drift on held-out rows against the
+original model, and check_drift refuses compact models whose accuracy drop
+or probability drift exceeds the configured bounds.
+"""
+
+import numpy as np
+
+from scorer import CompiledLinearScorer, QuantizedLinearScorer
+from features import HashedNgramFeaturizer
+from artifacts import MappedTfidfVectorizer
+
+WEIGHT_DTYPES = ('float32', 'int8')
+DEFAULT_PRUNE_THRESHOLD = 0.05
+DEFAULT_MAX_ACCURACY_DROP = 0.005
+DEFAULT_MAX_PROBA_DRIFT = 0.05
+
+
+def quantize_weights(coef, dtype):
+    """
+    Quantize fold weights.
+
+    Args:
+        coef (ndarray): (n_features, n_folds) float64 fold weights
+        dtype (str): 'float32', or 'int8' with a symmetric scale per fold
+
+    Returns:
+        tuple: (weights, scale) where scale is None for float32
+    """
+    if dtype == 'float32':
+        return coef.astype(np.float32), None
+    if dtype == 'int8':
+        scale = np.abs(coef).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        return np.round(coef / scale).astype(np.int8), scale
+    raise ValueError(f"Unsupported weight dtype: {dtype}")
+
+
+def prune_vocabulary(vectorizer, keep):
+    """
+    Restrict a mapped TF-IDF vectorizer to the kept feature columns.
+
+    Args:
+        vectorizer (MappedTfidfVectorizer): Vectorizer to prune
+        keep (ndarray): (n_features,) boolean mask of kept columns
+
+    Returns:
+        MappedTfidfVectorizer: Vectorizer whose columns are the kept
+        columns, renumbered in their original order
+    """
+    new_column = np.cumsum(keep) - 1
+    in_vocabulary = keep[vectorizer.columns]
+    # Rebuilt from a list so the fixed-width table shrinks to the longest kept term
+    terms = np.array(vectorizer.terms[in_vocabulary].tolist())
+    columns = new_column[vectorizer.columns[in_vocabulary]].astype(np.int32)
+    idf = np.asarray(vectorizer.idf_)[keep].astype(np.float32)
+    return MappedTfidfVectorizer(terms, columns, idf, vectorizer.params)
+
+
+def serving_featurizer(featurizer):
+    """
+    Copy a fitted HashedNgramFeaturizer with only what transform needs.
+
+    Args:
+        featurizer (HashedNgramFeaturizer): Fitted featurizer
+
+    Returns:
+        HashedNgramFeaturizer: Featurizer with a float32 IDF and no
+        document frequencies (it cannot be updated with partial_fit)
+    """
+    served = HashedNgramFeaturizer(featurizer.n_features, featurizer.ngram_range,
+                                   sublinear_tf=featurizer.sublinear_tf, norm=featurizer.norm)
+    served.idf_ = np.asarray(featurizer.idf_, dtype=np.float32)
+    served.doc_freq_ = None
+    served.n_docs_ = featurizer.n_docs_
+    return served
+
+
+def compact_model(model, vectorizer, threshold=DEFAULT_PRUNE_THRESHOLD, weight_dtype='int8'):
+    """
+    Prune and quantize a linear model and its vectorizer.
+
+    Args:
+        model: Fitted model supported by CompiledLinearScorer.from_model
+        vectorizer: Fitted TfidfVectorizer, MappedTfidfVectorizer or
+            HashedNgramFeaturizer
+        threshold (float): Minimum log-odds weight of a kept feature
+        weight_dtype (str): 'float32' or 'int8'
+
+    Returns:
+        tuple: (QuantizedLinearScorer, vectorizer, stats) where stats
+        summarizes the pruning and the weight sizes
+
+    Raises:
+        ValueError: If the model or vectorizer is unsupported, or no
+            feature is kept
+    """
+    scorer = model if isinstance(model, CompiledLinearScorer) else CompiledLinearScorer.from_model(model)
+    if scorer is None:
+        raise ValueError(f"Model of type {type(model).__name__} cannot be exported as a linear scorer")
+    coef = scorer.dense_coef()
+    keep = (np.abs(coef * scorer.a) >= threshold).any(axis=1)
+    if not keep.any():
+        raise ValueError(f"No feature has a log-odds weight of at least {threshold}")
+
+    weights = coef[keep]
+    rows = None
+    if isinstance(vectorizer, HashedNgramFeaturizer):
+        # Pruned columns all point at an appended zero row
+        weights = np.vstack([weights, np.zeros((1, coef.shape[1]))])
+        rows = np.where(keep, np.cumsum(keep) - 1, len(weights) - 1).astype(np.int32)
+        vectorizer = serving_featurizer(vectorizer)
+    else:
+        if not isinstance(vectorizer, MappedTfidfVectorizer):
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            if not isinstance(vectorizer, TfidfVectorizer):
+                raise ValueError(f"Vectorizer of type {type(vectorizer).__name__} cannot be exported")
+            vectorizer = MappedTfidfVectorizer.from_tfidf(vectorizer)
+        vectorizer = prune_vocabulary(vectorizer, keep)
+
+    weights, scale = quantize_weights(weights, weight_dtype)
+    compact = QuantizedLinearScorer(weights, scorer.intercept, scorer.a, scorer.b, scorer.classes_,
+                                    scale=scale, rows=rows)
+    stats = {
+        'prune_threshold': float(threshold),
+        'weight_dtype': weight_dtype,
+        'features': int(coef.shape[0]),
+        'kept_features': int(keep.sum()),
+        'weight_bytes': int(coef.nbytes),
+        'kept_weight_bytes': int(weights.nbytes + (rows.nbytes if rows is not None else 0)),
+    }
+    return compact, vectorizer, stats
+
+
+def measure_drift(model, vectorizer, compact, compact_vectorizer, texts, labels):
+    """
+    Compare a compact model with the model it was built from.
+
+    Args:
+        model: Original fitted model
+        vectorizer: Original vectorizer
+        compact: Compact scorer from compact_model
+        compact_vectorizer: Vectorizer from compact_model
+        texts (list): Preprocessed held-out texts
+        labels (list): Their labels
+
+    Returns:
+        dict: accuracy of both models, accuracy_drop, and the max and mean
+        absolute difference in positive class probability
+    """
+    labels = np.asarray(labels)
+    reference = model.predict_proba(vectorizer.transform(texts))[:, 1]
+    positive = compact.predict_proba(compact_vectorizer.transform(texts))[:, 1]
+    classes = np.asarray(compact.classes_)
+    # Same tie-breaking as predict: argmax over [negative, positive] picks negative at 0.5
+    accuracy = float(np.mean(classes[(reference > 0.5).astype(int)] == labels))
+    compact_accuracy = float(np.mean(classes[(positive > 0.5).astype(int)] == labels))
+    drift = np.abs(positive - reference)
+    return {
+        'rows': int(len(labels)),
+        'accuracy': accuracy,
+        'compact_accuracy': compact_accuracy,
+        'accuracy_drop': accuracy - compact_accuracy,
+        'max_proba_drift': float(drift.max()),
+        'mean_proba_drift': float(drift.mean()),
+    }
+
+
+def check_drift(drift, max_accuracy_drop=DEFAULT_MAX_ACCURACY_DROP, max_proba_drift=DEFAULT_MAX_PROBA_DRIFT):
+    """
+    Check measured drift against the configured bounds.
+
+    Args:
+        drift (dict): Result of measure_drift
+        max_accuracy_drop (float): Largest tolerated accuracy decrease
+        max_proba_drift (float): Largest tolerated probability difference
+
+    Raises:
+        ValueError: If either bound is exceeded
+    """
+    if drift['accuracy_drop'] > max_accuracy_drop:
+        raise ValueError(f"Accuracy drops by {drift['accuracy_drop']:.4f} "
+                         f"(bound {max_accuracy_drop}); lower the prune threshold")
+    if drift['max_proba_drift'] > max_proba_drift:
+        raise ValueError(f"Probabilities move by up to {drift['max_proba_drift']:.4f} "
+                         f"(bound {max_proba_drift}); lower the prune threshold or use float32")
@@ -0,0 +1,308 @@
+"""
+Model Registry and Loading
+==========================
+Loads model/vectorizer pairs into immutable ModelBundle objects and manages
+a registry of versioned artifact directories:
+
+    models/
+        ACTIVE                  name of the version currently served
+        v20261017-120000/       one directory per trained version, holding
+            sentiment_model.pkl     the pickles and/or a mapped artifact
+            vectorizer.pkl          (manifest.json + .npy files)
+            metrics.json
+            replay.parquet          sample of preprocessed training and
+                                    holdout rows for incremental updates
+
+The server swaps the whole bundle reference at once, so a request that
+started on one version finishes on it, and new requests see the new one.
+"""
+
+import os
+import re
+import json
+import time
+import pickle
+import hashlib
+
+from scorer import compile_model
+from artifacts import is_artifact_dir, load_artifact
+from explain import Explainer
+
+MODEL_FILE = 'sentiment_model.pkl'
+VECTORIZER_FILE = 'vectorizer.pkl'
+ACTIVE_FILE = 'ACTIVE'
+METRICS_FILE = 'metrics.json'
+REPLAY_FILE = 'replay.parquet'
+
+
+def version_sort_key(version):
+    """
+    Sort key ordering version names by their numbers, not as strings.
+
+    Keeps v20261017-120000-10 after v20261017-120000-2 (the suffixes
+    create_version adds when two versions are created in one second).
+
+    Args:
+        version (str): Version name
+
+    Returns:
+        list: Alternating text and integer parts of the name
+    """
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', version)]
+
+
+class ModelBundle:
+    """
+    Everything needed to score with one model version.
+
+    Attributes:
+        model: Loaded model (the compiled scorer for mapped artifacts)
+        vectorizer: Loaded vectorizer
+        scorer: Compiled scorer used for predictions
+        version (str): Version identifier, used to key cached predictions
+        source (str): Path the bundle was loaded from
+        load_seconds (float): Time taken to load the bundle
+    """
+
+    def __init__(self, model, vectorizer, scorer, version, source, load_seconds=0.0):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.scorer = scorer
+        self.version = version
+        self.source = source
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self._explainer = None
+
+    @property
+    def explainer(self):
+        """Explainer of this bundle, built on first use (it holds the feature names)."""
+        if self._explainer is None:
+            self._explainer = Explainer(self.scorer, self.vectorizer)
+        return self._explainer
+
+    def describe(self):
+        """
+        Summarize the bundle for /health and admin responses.
+
+        Returns:
+            dict: version, source, scorer type, load time
+        """
+        return {
+            'version': self.version,
+            'source': self.source,
+            'scorer': type(self.scorer).__name__,
+            'load_seconds': round(self.load_seconds, 4),
+            'loaded_at': self.loaded_at
+        }
+
+
+def compute_model_version(*paths):
+    """
+    Compute a short content hash identifying a set of model files.
+
+    Args:
+        *paths (str): Files to hash
+
+    Returns:
+        str: First 12 hex digits of the SHA-256 over all files
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def load_pickled_bundle(model_path, vectorizer_path, version=None):
+    """
+    Load a bundle from model and vectorizer pickles.
+
+    Args:
+        model_path (str): Pickled model
+        vectorizer_path (str): Pickled vectorizer
+        version (str): Version name; defaults to a content hash of the files
+
+    Returns:
+        ModelBundle: Loaded bundle with the model compiled where possible
+    """
+    start = time.perf_counter()
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(vectorizer_path, 'rb') as f:
+        vectorizer = pickle.load(f)
+    version = version or compute_model_version(model_path, vectorizer_path)
+    return ModelBundle(model, vectorizer, compile_model(model), version, os.path.dirname(os.path.abspath(model_path)),
+                       time.perf_counter() - start)
+
+
+def load_mapped_bundle(directory, version=None):
+    """
+    Load a bundle from a memory-mapped artifact directory.
+
+    Args:
+        directory (str): Artifact directory
+        version (str): Version name; defaults to the manifest checksum
+
+    Returns:
+        ModelBundle: Loaded bundle
+    """
+    start = time.perf_counter()
+    scorer, vectorizer, manifest = load_artifact(directory)
+    version = version or manifest['checksum'][:12]
+    return ModelBundle(scorer, vectorizer, scorer, version, os.path.abspath(directory),
+                       time.perf_counter() - start)
+
+
+def load_bundle_from_dir(directory, version=None):
+    """
+    Load a bundle from a directory holding a mapped artifact or pickles.
+
+    Args:
+        directory (str): Version or artifact directory
+        version (str): Version name
+
+    Returns:
+        ModelBundle: Loaded bundle (mapped artifact preferred)
+
+    Raises:
+        FileNotFoundError: If the directory holds no model
+    """
+    if is_artifact_dir(directory):
+        return load_mapped_bundle(directory, version)
+    model_path = os.path.join(directory, MODEL_FILE)
+    vectorizer_path = os.path.join(directory, VECTORIZER_FILE)
+    if not os.path.exists(model_path) or not os.path.exists(vectorizer_path):
+        raise FileNotFoundError(f"No model artifact found in {directory}")
+    return load_pickled_bundle(model_path, vectorizer_path, version)
+
+
+class ModelRegistry:
+    """
+    Directory of versioned model artifacts with an ACTIVE pointer file.
+
+    Args:
+        root (str): Registry root directory
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    @property
+    def active_path(self):
+        return os.path.join(self.root, ACTIVE_FILE)
+
+    def exists(self):
+        return os.path.isdir(self.root)
+
+    def versions(self):
+        """
+        List available versions, oldest first.
+
+        Returns:
+            list: Version names, in numeric order (see version_sort_key)
+        """
+        if not self.exists():
+            return []
+        return sorted((name for name in os.listdir(self.root)
+                       if os.path.isdir(os.path.join(self.root, name)) and not name.startswith('.')),
+                      key=version_sort_key)
+
+    def version_dir(self, version):
+        """
+        Resolve the directory of a version.
+
+        Raises:
+            KeyError: If the version does not exist
+        """
+        if version not in self.versions():
+            raise KeyError(f"Unknown model version: {version}")
+        return os.path.join(self.root, version)
+
+    def create_version(self, version=None):
+        """
+        Create an empty directory for a new version.
+
+        Args:
+            version (str): Version name; defaults to a v<timestamp> name
+
+        Returns:
+            tuple: (version, directory)
+        """
+        base = version or time.strftime('v%Y%m%d-%H%M%S')
+        version, suffix = base, 1
+        while os.path.exists(os.path.join(self.root, version)):
+            suffix += 1
+            version = f'{base}-{suffix}'
+        directory = os.path.join(self.root, version)
+        os.makedirs(directory)
+        return version, directory
+
+    def active_version(self):
+        """
+        Read the ACTIVE pointer.
+
+        Returns:
+            str: Active version, or None if unset
+        """
+        try:
+            with open(self.active_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_active(self, version):
+        """
+        Atomically point ACTIVE at a version.
+
+        Args:
+            version (str): Existing version
+        """
+        self.version_dir(version)
+        tmp_path = f'{self.active_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, self.active_path)
+
+    def load(self, version=None):
+        """
+        Load a version (the active one by default).
+
+        Args:
+            version (str): Version to load
+
+        Returns:
+            ModelBundle: Loaded bundle
+
+        Raises:
+            KeyError: If no version is given and none is active
+        """
+        version = version or self.active_version()
+        if version is None:
+            raise KeyError(f"No active model version in {self.root}")
+        return load_bundle_from_dir(self.version_dir(version), version)
+
+    def write_metrics(self, version, metrics):
+        """
+        Store evaluation metrics next to a version's artifacts.
+
+        Args:
+            version (str): Version
+            metrics (dict): JSON-serializable metrics
+        """
+        with open(os.path.join(self.version_dir(version), METRICS_FILE), 'w') as f:
+            json.dump(metrics, f, indent=2)
+
+    def read_metrics(self, version):
+        """
+        Read the metrics stored with a version.
+
+        Returns:
+            dict: Stored metrics, empty if none were written
+        """
+        try:
+            with open(os.path.join(self.version_dir(version), METRICS_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
@@ -0,0 +1,86 @@
+"""
+Response Encoding
+=================
+Faster JSON serialization and HTTP response compression for the API.
+
+FastJSONProvider makes jsonify use orjson when it is installed (it is an
+optional dependency) and ensure_ascii is off, and Flask's standard encoder
+otherwise. The two encode the same values, with these differences:
+
+- NaN and infinities become null with orjson; the standard encoder writes
+  the non-standard tokens NaN and Infinity
+- some floats are spelled differently (1e-05 vs 0.00001)
+- NumPy arrays and scalars are serialized by orjson only
+
+Dates and datetimes are passed to the provider's default, so both give
+HTTP dates. Compression is negotiated per request from the
+Accept-Encoding header, using gzip or deflate from the standard library.
+"""
+
+import gzip
+import zlib
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Encodings offered to clients, in order of preference
+SUPPORTED_ENCODINGS = ('gzip', 'deflate')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that serializes with orjson when available.
+
+    orjson always writes UTF-8, so it is only used when ensure_ascii is
+    off. Keys are sorted as with Flask's default provider. Calls with extra
+    json.dumps arguments (such as indent in debug mode) and objects orjson
+    cannot serialize fall back to the standard encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or self.ensure_ascii or set(kwargs) - {'separators'}:
+            return super().dumps(obj, **kwargs)
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=self.default, option=options).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+
+def negotiate_encoding(accept_encodings):
+    """
+    Pick the response encoding for a request.
+
+    Args:
+        accept_encodings: Parsed Accept-Encoding header (request.accept_encodings)
+
+    Returns:
+        str: 'gzip' or 'deflate', or None to send the body uncompressed
+    """
+    return accept_encodings.best_match(SUPPORTED_ENCODINGS)
+
+
+def compress_body(data, encoding, level=1):
+    """
+    Compress a response body.
+
+    Args:
+        data (bytes): Uncompressed body
+        encoding (str): 'gzip' or 'deflate'
+        level (int): Compression level, 1 (fastest) to 9 (smallest)
+
+    Returns:
+        bytes: Compressed body
+    """
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    if encoding == 'deflate':
+        # HTTP "deflate" is the zlib format (RFC 9110), not raw deflate
+        return zlib.compress(data, level)
+    raise ValueError(f"Unsupported content encoding: {encoding}")
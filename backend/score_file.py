@@ -0,0 +1,186 @@
+"""
+Offline Bulk Scoring for Restaurant Sentiment Analysis
+Scores a CSV or Parquet file of reviews without going through the HTTP API.
+
+The input is read in chunks, preprocessed across a process pool and scored with one
+vectorized call per chunk. Each finished chunk is written as a part file in the output
+directory together with a progress file, so an interrupted run resumes from the last
+finished chunk. The progress file records the model version (artifact checksum or a hash of
+the pickles), and a run is only resumed with the same model. The part files can be read back as one dataset, e.g.
+pd.read_parquet(output_dir) or pd.concat(map(pd.read_csv, sorted(glob(...)))).
+
+Usage:
+    python score_file.py reviews.csv scored/ --text-col "Review Text" --workers 8
+"""
+
+import os
+import json
+import time
+import pickle
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from preprocess import preprocess_many, create_preprocess_pool
+from inference import is_valid_review, score_processed, SENTIMENT_LABELS
+from scorer import compile_model
+from artifacts import is_artifact_dir, load_artifact
+from registry import compute_model_version
+from train_model import MODEL_PATH, VECTORIZER_PATH, positive_int
+
+PROGRESS_FILE = '_progress.json'
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+logger = logging.getLogger('score_file')
+
+
+def load_scoring_model(artifact_dir=None, model_path=MODEL_PATH, vectorizer_path=VECTORIZER_PATH):
+    # Prefer the memory-mapped artifact; otherwise unpickle and compile the model.
+    # Returns (scorer, vectorizer, version), the version named as the API's /health does.
+    if artifact_dir and is_artifact_dir(artifact_dir):
+        scorer, vectorizer, manifest = load_artifact(artifact_dir)
+        version = manifest['checksum'][:12]
+        logger.info(f"Loaded mapped artifact {artifact_dir} (checksum {version})")
+        return scorer, vectorizer, version
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(vectorizer_path, 'rb') as f:
+        vectorizer = pickle.load(f)
+    version = compute_model_version(model_path, vectorizer_path)
+    logger.info(f"Loaded {model_path} and {vectorizer_path} (version {version})")
+    return compile_model(model), vectorizer, version
+
+
+def iter_input_chunks(path, chunk_size, skip_chunks=0):
+    # Yields DataFrame chunks of the input, skipping the first skip_chunks chunks.
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for i, batch in enumerate(pq.ParquetFile(path).iter_batches(batch_size=chunk_size)):
+            if i >= skip_chunks:
+                yield batch.to_pandas()
+    else:
+        skiprows = range(1, skip_chunks * chunk_size + 1) if skip_chunks else None
+        yield from pd.read_csv(path, chunksize=chunk_size, skiprows=skiprows)
+
+
+def load_progress(output_dir, input_path, chunk_size, model_version=None):
+    # Refuses to resume a run of another input, chunk size or model, so the parts never mix models.
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    if not os.path.exists(path):
+        return {'input': os.path.abspath(input_path), 'chunk_size': chunk_size, 'model_version': model_version,
+                'completed_chunks': 0, 'rows': 0}
+    with open(path) as f:
+        progress = json.load(f)
+    if progress['input'] != os.path.abspath(input_path) or progress['chunk_size'] != chunk_size:
+        raise ValueError(f"{output_dir} holds a run for {progress['input']} with chunk size "
+                         f"{progress['chunk_size']}; use a new output directory or the same settings")
+    if progress.get('model_version') != model_version:
+        raise ValueError(f"{output_dir} holds a run scored with model version {progress.get('model_version')}, "
+                         f"not {model_version}; use a new output directory to score with this model")
+    return progress
+
+
+def save_progress(output_dir, progress):
+    path = os.path.join(output_dir, PROGRESS_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(progress, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def score_chunk(df, text_col, scorer, vectorizer, executor=None, workers=1):
+    texts = df[text_col].tolist()
+    valid = np.array([is_valid_review(text) for text in texts], dtype=bool)
+    valid_idx = np.flatnonzero(valid)
+
+    sentiment = np.full(len(df), None, dtype=object)
+    raw_prediction = np.full(len(df), -1, dtype=np.int64)
+    probabilities = np.full((len(df), 2), np.nan)
+    if len(valid_idx):
+        processed = preprocess_many([texts[i] for i in valid_idx], workers=workers,
+                                    chunk_size=max(1, len(valid_idx) // max(workers, 1) + 1), executor=executor)
+        labels, probabilities[valid_idx] = score_processed(scorer, vectorizer, processed)
+        raw_prediction[valid_idx] = labels
+        sentiment[valid_idx] = [SENTIMENT_LABELS[int(label)] for label in labels]
+
+    df = df.copy()
+    df['sentiment'] = sentiment
+    df['raw_prediction'] = raw_prediction
+    df['confidence'] = probabilities.max(axis=1)
+    df['prob_negative'] = probabilities[:, 0]
+    df['prob_positive'] = probabilities[:, 1]
+    return df
+
+
+def write_part(df, output_dir, index, output_format):
+    path = os.path.join(output_dir, f'part-{index:05d}.{output_format}')
+    tmp_path = path + '.tmp'
+    if output_format == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def score_file(input_path, output_dir, text_col, scorer, vectorizer, chunk_size=50000, workers=1,
+               output_format=None, model_version=None):
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    output_format = output_format or ('parquet' if input_path.endswith('.parquet') else 'csv')
+    os.makedirs(output_dir, exist_ok=True)
+    progress = load_progress(output_dir, input_path, chunk_size, model_version)
+    if progress.get('finished'):
+        logger.info(f"Already finished: {progress['rows']} rows in {progress['completed_chunks']} part(s)")
+        return progress
+    if progress['completed_chunks']:
+        logger.info(f"Resuming after {progress['completed_chunks']} finished chunk(s) ({progress['rows']} rows)")
+
+    executor = create_preprocess_pool(workers) if workers > 1 else None
+    start = time.perf_counter()
+    rows_this_run = 0
+    try:
+        for df in iter_input_chunks(input_path, chunk_size, skip_chunks=progress['completed_chunks']):
+            scored = score_chunk(df, text_col, scorer, vectorizer, executor=executor, workers=workers)
+            write_part(scored, output_dir, progress['completed_chunks'], output_format)
+            progress['completed_chunks'] += 1
+            progress['rows'] += len(df)
+            save_progress(output_dir, progress)
+            rows_this_run += len(df)
+            elapsed = time.perf_counter() - start
+            logger.info(f"Chunk {progress['completed_chunks']}: {progress['rows']} rows scored "
+                        f"({rows_this_run / elapsed:,.0f} rows/s)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    progress['finished'] = True
+    save_progress(output_dir, progress)
+    logger.info(f"Finished: {progress['rows']} rows in {progress['completed_chunks']} part(s) under {output_dir}")
+    return progress
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Score a CSV or Parquet file of reviews.')
+    parser.add_argument('input', help='Input .csv or .parquet file')
+    parser.add_argument('output_dir', help='Directory for scored part files and progress state')
+    parser.add_argument('--text-col', default='Review Text', help='Column holding the review text')
+    parser.add_argument('--chunk-size', type=positive_int, default=50000, help='Rows scored per chunk')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Preprocessing processes')
+    parser.add_argument('--format', choices=['csv', 'parquet'], help='Output format (default: same as input)')
+    parser.add_argument('--artifact-dir', default='model_artifact', help='Mapped artifact to use if present')
+    parser.add_argument('--model-path', default=MODEL_PATH)
+    parser.add_argument('--vectorizer-path', default=VECTORIZER_PATH)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scorer, vectorizer, model_version = load_scoring_model(args.artifact_dir, args.model_path,
+                                                           args.vectorizer_path)
+    score_file(args.input, args.output_dir, args.text_col, scorer, vectorizer, chunk_size=args.chunk_size,
+               workers=args.workers, output_format=args.format, model_version=model_version)
+
+
+if __name__ == '__main__':
+    main()
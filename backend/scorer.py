@@ -0,0 +1,235 @@
+"""
+Compiled Linear Scorer for the Calibrated SVM Ensemble
+=======================================================
+CalibratedClassifierCV(LinearSVC, cv=5) keeps one LinearSVC and one sigmoid
+calibrator per fold. Scoring through it evaluates each fold separately.
+
+Every fold is linear, so all coef/intercept pairs can be stacked into one
+dense matrix. A batch is then scored with a single sparse-dense matmul
+followed by a vectorized sigmoid averaged across folds, which reproduces
+CalibratedClassifierCV.predict_proba for the binary case.
+
+QuantizedLinearScorer scores with pruned float32 or int8 weights, as written
+by the compact export (quantize.py).
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit
+
+# Maximum absolute difference tolerated between the compiled probabilities
+# and the original model's predict_proba before falling back to the model.
+DEFAULT_TOLERANCE = 1e-6
+
+# QuantizedLinearScorer gathers weight rows instead of converting all of them
+# when a batch has fewer than 1/GATHER_RATIO non-zero entries per stored row
+GATHER_RATIO = 16
+
+
+class CompiledLinearScorer:
+    """
+    Binary probability scorer built from stacked linear folds.
+
+    For fold k the positive class probability is
+    1 / (1 + exp(a_k * (x . w_k + c_k) + b_k)), and the final probability is
+    the mean over folds, as in CalibratedClassifierCV with ensemble=True.
+
+    Attributes:
+        coef (ndarray): (n_features, n_folds) stacked fold weights
+        intercept (ndarray): (n_folds,) fold intercepts
+        a (ndarray): (n_folds,) sigmoid calibration slopes
+        b (ndarray): (n_folds,) sigmoid calibration offsets
+        classes_ (ndarray): Class labels [negative, positive]
+    """
+
+    def __init__(self, coef, intercept, a, b, classes):
+        self.coef = np.ascontiguousarray(coef)
+        self.intercept = np.asarray(intercept)
+        self.a = np.asarray(a)
+        self.b = np.asarray(b)
+        self.classes_ = np.asarray(classes)
+
+    @property
+    def n_features_in_(self):
+        return self.coef.shape[0]
+
+    @property
+    def n_folds(self):
+        return self.coef.shape[1]
+
+    def dense_coef(self):
+        """
+        Return the fold weights as a float64 matrix.
+
+        Returns:
+            ndarray: (n_features, n_folds) fold weights
+        """
+        return np.asarray(self.coef, dtype=np.float64)
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Stack the folds of a fitted binary CalibratedClassifierCV.
+
+        Args:
+            model: Fitted CalibratedClassifierCV with sigmoid calibration
+                over a linear base estimator, or a log-loss SGDClassifier
+
+        Returns:
+            CompiledLinearScorer: Compiled scorer, or None if the model
+            does not have a supported structure
+        """
+        if len(getattr(model, 'classes_', [])) != 2:
+            return None
+
+        # Logistic-loss SGD models (streaming training) are a single
+        # un-calibrated fold with p = 1 / (1 + exp(-(x . w + c)))
+        if getattr(model, 'loss', None) == 'log_loss' and hasattr(model, 'coef_'):
+            return cls(np.asarray(model.coef_, dtype=np.float64).T, np.ravel(model.intercept_),
+                       [-1.0], [0.0], model.classes_)
+
+        folds = getattr(model, 'calibrated_classifiers_', None)
+        if not folds:
+            return None
+
+        coefs, intercepts, slopes, offsets = [], [], [], []
+        for fold in folds:
+            estimator = getattr(fold, 'estimator', None)
+            calibrators = getattr(fold, 'calibrators', [])
+            if getattr(fold, 'method', None) != 'sigmoid' or len(calibrators) != 1:
+                return None
+            if not hasattr(estimator, 'coef_') or estimator.coef_.shape[0] != 1:
+                return None
+            coefs.append(np.asarray(estimator.coef_, dtype=np.float64).ravel())
+            intercepts.append(float(np.ravel(estimator.intercept_)[0]))
+            slopes.append(float(calibrators[0].a_))
+            offsets.append(float(calibrators[0].b_))
+
+        return cls(np.column_stack(coefs), intercepts, slopes, offsets, model.classes_)
+
+    def decision_matrix(self, X):
+        """
+        Compute the raw decision value of every fold.
+
+        Args:
+            X (sparse matrix): (n_samples, n_features) feature matrix
+
+        Returns:
+            ndarray: (n_samples, n_folds) decision values
+        """
+        return np.asarray(X @ self.coef) + self.intercept
+
+    def predict_proba(self, X):
+        """
+        Compute class probabilities averaged across folds.
+
+        Args:
+            X (sparse matrix): (n_samples, n_features) feature matrix
+
+        Returns:
+            ndarray: (n_samples, 2) probabilities [negative, positive]
+        """
+        positive = expit(-(self.decision_matrix(X) * self.a + self.b)).mean(axis=1)
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        """
+        Predict class labels.
+
+        Args:
+            X (sparse matrix): (n_samples, n_features) feature matrix
+
+        Returns:
+            ndarray: Predicted class labels
+        """
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class QuantizedLinearScorer(CompiledLinearScorer):
+    """
+    CompiledLinearScorer over pruned, quantized fold weights.
+
+    coef holds float32 weights, or int8 weights with one scale per fold
+    (w_kj = coef[j, k] * scale[k]). With rows, coef only holds the kept
+    features plus a final all-zero row: rows maps every feature column to
+    its coef row, and pruned features to the zero row.
+
+    scipy converts the weights to float64 on every product, which costs
+    time in proportion to the kept features. Batches with few non-zero
+    entries instead gather the weight rows of those entries and sum them
+    per row.
+
+    Attributes:
+        scale (ndarray): (n_folds,) weight scale per fold, or None
+        rows (ndarray): (n_features,) coef row of each feature column, or
+            None if coef has a row for every feature
+    """
+
+    def __init__(self, coef, intercept, a, b, classes, scale=None, rows=None):
+        super().__init__(coef, intercept, a, b, classes)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        self.rows = rows
+
+    @property
+    def n_features_in_(self):
+        return self.coef.shape[0] if self.rows is None else self.rows.shape[0]
+
+    def dense_coef(self):
+        coef = np.asarray(self.coef, dtype=np.float64)
+        if self.scale is not None:
+            coef = coef * self.scale
+        return coef if self.rows is None else coef[self.rows]
+
+    def decision_matrix(self, X):
+        X = X.tocsr()
+        n_rows = X.shape[0]
+        rows = X.indices if self.rows is None else self.rows[X.indices]
+        if X.nnz == 0:
+            decision = np.zeros((n_rows, self.n_folds))
+        elif X.nnz * GATHER_RATIO < self.coef.shape[0]:
+            contributions = self.coef[rows] * X.data[:, None]
+            # reduceat sums each slice up to the next offset, so only non-empty rows are reduced
+            starts = X.indptr[:-1]
+            non_empty = starts != X.indptr[1:]
+            decision = np.zeros((n_rows, self.n_folds))
+            decision[non_empty] = np.add.reduceat(contributions, starts[non_empty], axis=0)
+        else:
+            if self.rows is not None:
+                X = sp.csr_matrix((X.data, rows, X.indptr), shape=(n_rows, self.coef.shape[0]))
+            decision = np.asarray(X @ self.coef)
+        if self.scale is not None:
+            decision = decision * self.scale
+        return decision + self.intercept
+
+
+def compile_model(model, tolerance=DEFAULT_TOLERANCE, n_probe=64):
+    """
+    Compile a model into a CompiledLinearScorer when possible.
+
+    The compiled scorer is checked against model.predict_proba on random
+    TF-IDF-like probe rows and is only used if every probability agrees
+    within tolerance.
+
+    Args:
+        model: Fitted classifier
+        tolerance (float): Maximum allowed absolute probability difference
+        n_probe (int): Number of probe rows used for the check
+
+    Returns:
+        object: CompiledLinearScorer, or the original model if it cannot
+        be compiled or does not match
+    """
+    scorer = CompiledLinearScorer.from_model(model)
+    if scorer is None:
+        return model
+
+    probe = sp.random(n_probe, scorer.n_features_in_, density=min(1.0, 50.0 / scorer.n_features_in_),
+                      format='csr', random_state=0)
+    norms = np.sqrt(np.asarray(probe.multiply(probe).sum(axis=1))).ravel()
+    norms[norms == 0] = 1.0
+    probe = sp.csr_matrix(probe.multiply(1.0 / norms[:, None]))
+
+    drift = np.abs(scorer.predict_proba(probe) - model.predict_proba(probe)).max()
+    if drift > tolerance:
+        return model
+    return scorer
@@ -0,0 +1,267 @@
+"""
+Production Server for Restaurant Sentiment Analysis API
+========================================================
+Pre-fork launcher: the master process loads and warms up the model once,
+binds the listening socket, then forks worker processes that share the
+model pages copy-on-write. /metrics combines the values of all workers
+through per-worker files in METRICS_DIR (a temporary directory by default),
+and every worker follows model reloads. Each worker serves requests from a bounded
+thread pool with a bounded queue of accepted connections; connections are
+closed after each response so that idle clients cannot hold pool threads.
+Debug mode and the reloader are off.
+
+Usage:
+    python serve.py --host 0.0.0.0 --port 5000 --workers 4 --threads 8
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from app import (create_app, enable_model_watcher, ensure_model_watcher, share_metrics, start_worker_metrics,
+                 metrics)
+
+
+class PoolRequestHandler(WSGIRequestHandler):
+    """
+    Request handler for ThreadPoolWSGIServer.
+
+    Speaks HTTP/1.0, so every connection is closed after its response:
+    with HTTP/1.1 keep-alive (werkzeug's default for threaded servers), each
+    open client connection would hold a pool thread until the client
+    disconnects, starving every other connection once the pool is taken.
+    Socket reads and writes time out after the server's request_timeout.
+    """
+
+    protocol_version = 'HTTP/1.0'
+
+    def setup(self):
+        self.timeout = self.server.request_timeout
+        super().setup()
+
+
+class QuietRequestHandler(PoolRequestHandler):
+    """Request handler without per-request access logging."""
+
+    def log_request(self, code='-', size='-'):
+        pass
+
+
+class ThreadPoolWSGIServer(BaseWSGIServer):
+    """
+    WSGI server that handles requests on a fixed-size thread pool.
+
+    Unlike werkzeug's threaded dev server, the number of concurrent
+    requests per worker is capped by the pool size. At most queue_size
+    accepted connections wait for a thread; beyond that the server stops
+    accepting, and new connections wait in the listen backlog (where other
+    workers sharing the socket can pick them up).
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads=8, queue_size=64, request_timeout=30, **kwargs):
+        super().__init__(host, port, app, **kwargs)
+        self.request_timeout = request_timeout
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='request')
+        self.slots = threading.BoundedSemaphore(threads + queue_size)
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        try:
+            self.executor.submit(self._process_request_thread, request, client_address)
+        except RuntimeError:
+            # Executor already shut down
+            self.slots.release()
+            self.shutdown_request(request)
+
+    def _process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        executor = getattr(self, 'executor', None)
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def bind_socket(host, port, backlog=1024):
+    """
+    Create the listening socket shared by all workers.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind
+        backlog (int): Listen queue size
+
+    Returns:
+        socket.socket: Bound, listening socket
+    """
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock, host, port, threads, access_log, queue_size=64, request_timeout=30):
+    """
+    Serve requests on an already bound socket until terminated.
+
+    Args:
+        app: WSGI application
+        sock (socket.socket): Listening socket
+        host (str): Bound host (used for address family detection)
+        port (int): Bound port
+        threads (int): Size of the request thread pool
+        access_log (bool): Log every request
+        queue_size (int): Accepted connections allowed to wait for a thread
+        request_timeout (float): Socket timeout of a connection, in seconds
+    """
+    handler = PoolRequestHandler if access_log else QuietRequestHandler
+    server = ThreadPoolWSGIServer(host, port, app, threads=threads, queue_size=queue_size,
+                                  request_timeout=request_timeout, handler=handler, fd=sock.fileno())
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+
+
+def spawn_worker(app, sock, args):
+    """
+    Fork one worker process.
+
+    Returns:
+        int: Child process id
+    """
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            # Follow reloads made through any other worker from the start
+            ensure_model_watcher()
+            start_worker_metrics()
+            run_worker(app, sock, args.host, args.port, args.threads, args.access_log,
+                       args.queue_size, args.request_timeout)
+        finally:
+            try:
+                metrics.flush()
+            finally:
+                os._exit(0)
+    return pid
+
+
+def supervise(app, sock, args):
+    """
+    Fork the workers, restart any that die, and stop them on SIGINT/SIGTERM.
+    """
+    workers = {spawn_worker(app, sock, args) for _ in range(args.workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(0.1)
+            workers.add(spawn_worker(app, sock, args))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Run the sentiment API with a pre-fork server.')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', os.cpu_count() or 1)),
+                        help='Number of worker processes')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 8)),
+                        help='Request threads per worker')
+    parser.add_argument('--queue-size', type=int, default=int(os.environ.get('WEB_QUEUE_SIZE', 64)),
+                        help='Accepted connections per worker that may wait for a request thread')
+    parser.add_argument('--request-timeout', type=float, default=float(os.environ.get('WEB_REQUEST_TIMEOUT', 30)),
+                        help='Seconds a connection may stall while sending a request or reading a response')
+    parser.add_argument('--access-log', action='store_true', help='Log every request')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    print("="*60)
+    print("RESTAURANT SENTIMENT ANALYSIS - PRODUCTION SERVER")
+    print("="*60)
+
+    start = time.perf_counter()
+    # Always load synchronously: background threads would not survive the fork
+    app = create_app(background_warmup=False)
+    print(f"\nModel loaded and warmed up in {time.perf_counter() - start:.2f}s")
+
+    sock = bind_socket(args.host, args.port)
+    args.port = sock.getsockname()[1]
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} worker(s) x {args.threads} thread(s)")
+
+    if args.workers <= 1 or not hasattr(os, 'fork'):
+        run_worker(app, sock, args.host, args.port, args.threads, args.access_log,
+                   args.queue_size, args.request_timeout)
+        return
+
+    # /admin/reload only swaps the worker that receives it; the others follow the
+    # registry's ACTIVE pointer, so the watcher is always on with several workers
+    enable_model_watcher()
+
+    # Each scrape is answered by one worker, which reports the values of all of them
+    metrics_dir = os.environ.get('METRICS_DIR') or None
+    temporary_metrics_dir = metrics_dir is None
+    if temporary_metrics_dir:
+        metrics_dir = tempfile.mkdtemp(prefix='restro-metrics-')
+    share_metrics(metrics_dir)
+
+    # Move everything loaded so far out of the GC's tracked generations so that
+    # collections in the workers do not touch (and un-share) those pages.
+    gc.freeze()
+    try:
+        supervise(app, sock, args)
+    finally:
+        if temporary_metrics_dir:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Hyperparameter Sweep for Restaurant Sentiment Analysis
+Fits each distinct TF-IDF configuration once, shares the resulting sparse matrices
+across all classifier variants trained in parallel, and writes a results table with
+quality, training time, artifact size and single-review inference latency.
+
+Example grid file (JSON):
+{
+    "vectorizer": {"max_features": [5000, 20000], "ngram_range": [[1, 1], [1, 2]]},
+    "classifier": {"C": [0.1, 1.0], "cv": [3, 5]}
+}
+"""
+
+import json
+import time
+import pickle
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.model_selection import train_test_split, ParameterGrid
+from sklearn.metrics import accuracy_score, f1_score
+
+from scorer import compile_model
+from train_model import (DATA_PATH, PREPROCESS_CACHE_DIR, load_dataset, create_sentiment_labels,
+                         preprocess_dataset, build_vectorizer, build_classifier, collect_fold_stats)
+
+logger = logging.getLogger('sweep')
+
+DEFAULT_GRID = {
+    'vectorizer': {'max_features': [5000, 20000], 'ngram_range': [[1, 1], [1, 2]]},
+    'classifier': {'C': [0.1, 1.0], 'cv': [5]},
+}
+LATENCY_REPEATS = 200
+
+
+def measure_latency(vectorizer, model, text, repeats=LATENCY_REPEATS):
+    # Median wall time of vectorizing and scoring one preprocessed review,
+    # with the model compiled the same way app.py serves it.
+    scorer = compile_model(model)
+    scorer.predict_proba(vectorizer.transform([text]))
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scorer.predict_proba(vectorizer.transform([text]))
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def fit_candidate(vec_params, clf_params, vectorizer, X_train, y_train, X_test, y_test):
+    # Returns (result row, fitted classifier); latency is measured later, outside the
+    # parallel fits, so that it is not inflated by other candidates competing for CPU.
+    clf = build_classifier(**clf_params)
+    start = time.perf_counter()
+    clf.fit(X_train, y_train)
+    train_time = time.perf_counter() - start
+    folds = collect_fold_stats(clf)
+    preds = clf.predict(X_test)
+    return {
+        **{f'vec_{k}': str(v) for k, v in vec_params.items()},
+        **{f'clf_{k}': str(v) for k, v in clf_params.items()},
+        'accuracy': accuracy_score(y_test, preds),
+        'f1': f1_score(y_test, preds),
+        'train_seconds': train_time,
+        'max_fold_iterations': max(fold['n_iter'] for fold in folds),
+        'artifact_bytes': len(pickle.dumps(clf)) + len(pickle.dumps(vectorizer)),
+    }, clf
+
+
+def mark_frontier(results):
+    # A candidate is on the speed/quality frontier if no other candidate is
+    # at least as accurate and at least as fast while strictly better in one.
+    f1 = results['f1'].to_numpy()
+    latency = results['latency_ms'].to_numpy()
+    dominated = [
+        bool(np.any((f1 >= f1[i]) & (latency <= latency[i]) & ((f1 > f1[i]) | (latency < latency[i]))))
+        for i in range(len(results))
+    ]
+    results['frontier'] = ~np.array(dominated, dtype=bool)
+    return results
+
+
+def run_sweep(X_train_texts, y_train, X_test_texts, y_test, grid, n_jobs=-1):
+    rows = []
+    sample_text = max(X_test_texts, key=len) if X_test_texts else ''
+    for vec_params in ParameterGrid(grid['vectorizer']):
+        logger.info(f"Fitting vectorizer {vec_params}...")
+        vectorizer = build_vectorizer(**vec_params)
+        start = time.perf_counter()
+        X_train = vectorizer.fit_transform(X_train_texts)
+        vectorize_time = time.perf_counter() - start
+        X_test = vectorizer.transform(X_test_texts)
+
+        candidates = list(ParameterGrid(grid['classifier']))
+        logger.info(f"Training {len(candidates)} classifier variant(s) on {X_train.shape} features...")
+        fitted = Parallel(n_jobs=n_jobs)(
+            delayed(fit_candidate)(vec_params, clf_params, vectorizer, X_train, y_train, X_test, y_test)
+            for clf_params in candidates
+        )
+        # Latencies are measured one candidate at a time, once every fit has finished
+        results = []
+        for result, clf in fitted:
+            result['latency_ms'] = measure_latency(vectorizer, clf, sample_text) * 1000
+            result['vectorize_seconds'] = vectorize_time
+            results.append(result)
+            logger.info(f"  acc={result['accuracy']:.4f} f1={result['f1']:.4f} "
+                        f"train={result['train_seconds']:.1f}s latency={result['latency_ms']:.3f}ms "
+                        f"{ {k: v for k, v in result.items() if k.startswith('clf_')} }")
+        rows.extend(results)
+
+    return mark_frontier(pd.DataFrame(rows)).sort_values(['f1', 'latency_ms'], ascending=[False, True])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Sweep vectorizer and classifier settings.')
+    parser.add_argument('--grid', help='JSON file with "vectorizer" and "classifier" parameter grids')
+    parser.add_argument('--output', default='sweep_results.csv', help='Results table (default: %(default)s)')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel classifier fits (default: all cores)')
+    parser.add_argument('--workers', type=int, default=1, help='Processes used for text preprocessing')
+    parser.add_argument('--cache-dir', default=PREPROCESS_CACHE_DIR,
+                        help='Directory of the preprocessed-corpus cache (default: %(default)s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+
+    df = load_dataset(DATA_PATH)
+    df_filtered = create_sentiment_labels(df, rating_col='Rating')
+    texts, labels = preprocess_dataset(df_filtered, text_col='Review Text', workers=args.workers,
+                                       cache_dir=args.cache_dir)
+    X_train, X_test, y_train, y_test = train_test_split(texts, labels, test_size=0.2, random_state=42, stratify=labels)
+
+    results = run_sweep(X_train, y_train, X_test, y_test, grid, n_jobs=args.jobs)
+    results.to_csv(args.output, index=False)
+    logger.info(f"Wrote {len(results)} results to {args.output}")
+    logger.info("Speed/quality frontier:\n" + results[results['frontier']].to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
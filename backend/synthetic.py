@@ -0,0 +1,41 @@
+"""
+Synthetic Review Corpus
+=======================
+Seeded generator of restaurant-review-like texts for benchmark.py and
+loadtest.py. Review lengths (in sentences) follow a log-normal distribution,
+like real review lengths: most are short, a few are very long. Only the
+standard library is used, so load generators can import it cheaply.
+"""
+
+import math
+import random
+
+SUBJECTS = ['the food', 'our waiter', 'the pasta', 'the pizza', 'the service', 'the staff', 'the burger',
+            'the dessert', 'the ambiance', 'the coffee', 'the sushi', 'the steak', 'the wine list', 'the menu']
+POSITIVE = ['delicious', 'amazing', 'friendly', 'fresh', 'perfectly cooked', 'great value', 'cozy',
+            'attentive', 'tasty', 'excellent', 'wonderful', 'the best in town']
+NEGATIVE = ['cold', 'bland', 'rude', 'overpriced', 'slow', 'greasy', 'dirty', 'stale', 'burnt',
+            'disappointing', 'not worth it', 'the worst we have had']
+FILLERS = ['We came here on a Friday night.', "I can't believe we waited 45 minutes!",
+           'Parking was easy.', 'My friends ordered the special.', 'We will definitely be back.',
+           'Never again.', 'Check out <b>their</b> website at https://example.com/menu.',
+           'The place was packed (as usual).', 'Prices are around $20-30 per person.']
+
+
+def generate_corpus(n_reviews, seed=42, mean_sentences=5.0, sigma=0.6, max_sentences=60):
+    rng = random.Random(seed)
+    mu = math.log(mean_sentences) - sigma ** 2 / 2
+    reviews = []
+    for _ in range(n_reviews):
+        n_sentences = min(max_sentences, max(1, int(round(rng.lognormvariate(mu, sigma)))))
+        sentences = []
+        for _ in range(n_sentences):
+            roll = rng.random()
+            if roll < 0.4:
+                sentences.append(f"{rng.choice(SUBJECTS).capitalize()} was {rng.choice(POSITIVE)}.")
+            elif roll < 0.8:
+                sentences.append(f"{rng.choice(SUBJECTS).capitalize()} was {rng.choice(NEGATIVE)}.")
+            else:
+                sentences.append(rng.choice(FILLERS))
+        reviews.append(' '.join(sentences))
+    return reviews
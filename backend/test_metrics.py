@@ -0,0 +1,60 @@
+"""Tests for combining metrics of several worker processes."""
+
+import os
+import json
+
+from metrics import MetricsRegistry, SIZE_BUCKETS
+
+
+def make_registry():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ('status',))
+    depth = registry.gauge('queue_depth', 'Queue depth', merge='sum')
+    sizes = registry.histogram('batch_size', 'Batch size', buckets=SIZE_BUCKETS)
+    return registry, requests, depth, sizes
+
+
+def write_worker_file(directory, pid, registry):
+    with open(os.path.join(directory, f'metrics-{pid}.json'), 'w') as f:
+        json.dump({metric.name: metric.snapshot() for metric in registry._metrics}, f)
+
+
+def test_shared_render_sums_counters_and_histograms_of_all_workers(tmp_path):
+    registry, requests, depth, sizes = make_registry()
+    registry.share(str(tmp_path))
+    requests.inc(status='200')
+    depth.set(2)
+    sizes.observe(4)
+
+    # Values flushed by another process that has since exited (no such pid)
+    other, other_requests, other_depth, other_sizes = make_registry()
+    other_requests.inc(3, status='200')
+    other_requests.inc(status='500')
+    other_depth.set(5)
+    other_sizes.observe(4)
+    other_sizes.observe(64)
+    write_worker_file(str(tmp_path), 2 ** 22 + 1, other)
+
+    lines = registry.render().splitlines()
+    assert 'requests_total{status="200"} 4' in lines
+    assert 'requests_total{status="500"} 1' in lines
+    assert 'batch_size_count 3' in lines
+    assert 'batch_size_bucket{le="4"} 2' in lines
+    # Gauges only count live workers; the sharing (parent) process is excluded too
+    assert 'queue_depth 2' not in lines and 'queue_depth 5' not in lines
+
+
+def test_unshared_render_reports_this_process(tmp_path):
+    registry, requests, depth, _ = make_registry()
+    requests.inc(2, status='200')
+    depth.set(7)
+    lines = registry.render().splitlines()
+    assert 'requests_total{status="200"} 2' in lines
+    assert 'queue_depth 7' in lines
+    assert not os.listdir(tmp_path)
+
+
+def test_collectors_run_before_render():
+    registry, requests, _, _ = make_registry()
+    registry.collector(lambda: requests.set_total(9, status='200'))
+    assert 'requests_total{status="200"} 9' in registry.render().splitlines()
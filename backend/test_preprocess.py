@@ -0,0 +1,54 @@
+"""Tests for text preprocessing: the fast path against the NLTK reference, and preprocess_many."""
+
+import pytest
+
+pytest.importorskip('nltk')
+
+from preprocess import preprocess_many, preprocess_text_fast, preprocess_text_reference, verify_fast_pipeline
+
+CORPUS = [
+    # Contractions the Treebank tokenizer splits, including at the end of the text
+    'I cannot believe how good this was',
+    'We cannot',
+    'We are gonna come back',
+    'We are gonna',
+    'I wanna',
+    'You gotta try the soup, gotta',
+    "Can't wait, won't leave, shouldn't miss, don't",
+    # HTML
+    'Great <b>food</b> and <a href="/menu">friendly</a> staff!<br/>',
+    '<p>Unclosed <i>tags',
+    # URLs
+    'See https://example.com/menu?item=1&x=2 and www.example.org for more',
+    'http://a.b',
+    # Digits
+    'Paid 25 dollars for 2 dishes, 100% worth it',
+    'Table 4B at 7pm',
+    # Non-ASCII
+    'Café était génial, crème brûlée naïve',
+    'Ｆｕｌｌ ｗｉｄｔｈ letters',
+    'Sushi 🍣 was amazing ✨',
+    'Straße größer',
+    # Plurals and negations
+    'The dinners were tasty and the geese were not dry',
+    'Not bad, no complaints, nor regrets',
+    # Empty and whitespace-only
+    '',
+    '   \t\n ',
+    '!!! ... ???',
+]
+
+
+def test_fast_pipeline_matches_reference():
+    assert verify_fast_pipeline(CORPUS) == []
+
+
+@pytest.mark.parametrize('text', ['We cannot', 'We are gonna', 'I wanna'])
+def test_trailing_contractions_are_split(text):
+    assert preprocess_text_fast(text) == preprocess_text_reference(text)
+
+
+@pytest.mark.parametrize('chunk_size', [0, -1])
+def test_preprocess_many_rejects_non_positive_chunk_size(chunk_size):
+    with pytest.raises(ValueError, match='chunk_size'):
+        preprocess_many(CORPUS, chunk_size=chunk_size)
@@ -0,0 +1,55 @@
+"""Tests for the orjson-backed JSON provider."""
+
+import json
+import math
+import datetime
+
+import pytest
+from flask import Flask
+
+from responses import FastJSONProvider
+
+orjson = pytest.importorskip('orjson')
+
+
+def make_provider(ensure_ascii=False):
+    provider = FastJSONProvider(Flask(__name__))
+    provider.ensure_ascii = ensure_ascii
+    return provider
+
+
+def standard_dumps(provider, obj):
+    return json.dumps(obj, default=provider.default, sort_keys=provider.sort_keys,
+                      ensure_ascii=provider.ensure_ascii, separators=(',', ':'))
+
+
+def test_prediction_payload_matches_standard_encoder():
+    provider = make_provider()
+    payload = {
+        'results': [{'index': 0, 'original_review': 'Café était génial', 'sentiment': 'Positive',
+                     'confidence': 0.9312, 'probabilities': {'negative': 0.0688, 'positive': 0.9312}}],
+        'total': 1,
+        'skipped': None,
+    }
+    assert provider.dumps(payload, separators=(',', ':')) == standard_dumps(provider, payload)
+
+
+def test_nan_and_infinity_are_null():
+    provider = make_provider()
+    payload = {'nan': math.nan, 'inf': math.inf, 'ninf': -math.inf}
+    encoded = provider.dumps(payload)
+    assert encoded == '{"inf":null,"nan":null,"ninf":null}'
+    assert json.loads(encoded) == {'inf': None, 'nan': None, 'ninf': None}
+
+
+def test_datetimes_use_the_provider_default():
+    provider = make_provider()
+    payload = {'at': datetime.datetime(2026, 10, 17, 12, 30, tzinfo=datetime.timezone.utc),
+               'on': datetime.date(2026, 10, 17)}
+    assert provider.dumps(payload, separators=(',', ':')) == standard_dumps(provider, payload)
+
+
+def test_ensure_ascii_uses_standard_encoder():
+    provider = make_provider(ensure_ascii=True)
+    payload = {'review': 'Café', 'nan': math.nan}
+    assert provider.dumps(payload) == '{"nan": NaN, "review": "Caf\\u00e9"}'
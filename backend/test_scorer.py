@@ -0,0 +1,93 @@
+"""Tests for the compiled and quantized linear scorers."""
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+import scorer
+from scorer import DEFAULT_TOLERANCE, CompiledLinearScorer, QuantizedLinearScorer, compile_model
+
+N_FEATURES = 200
+N_FOLDS = 3
+
+
+def make_scorer(weight_dtype, pruned):
+    rng = np.random.default_rng(0)
+    n_kept = N_FEATURES // 2 if pruned else N_FEATURES
+    if weight_dtype == 'int8':
+        coef = rng.integers(-127, 128, size=(n_kept, N_FOLDS)).astype(np.int8)
+        scale = rng.uniform(0.001, 0.01, size=N_FOLDS)
+    else:
+        coef = rng.normal(size=(n_kept, N_FOLDS)).astype(np.float32)
+        scale = None
+    rows = None
+    if pruned:
+        # Every other column is pruned and points at the appended zero row
+        coef = np.vstack([coef, np.zeros((1, N_FOLDS), dtype=coef.dtype)])
+        rows = np.where(np.arange(N_FEATURES) % 2 == 0, np.arange(N_FEATURES) // 2, n_kept).astype(np.int32)
+    intercept = rng.normal(size=N_FOLDS)
+    a = -rng.uniform(0.5, 2.0, size=N_FOLDS)
+    b = rng.normal(scale=0.1, size=N_FOLDS)
+    return QuantizedLinearScorer(coef, intercept, a, b, np.array([0, 1]), scale=scale, rows=rows)
+
+
+def make_batch():
+    # Leading, middle and trailing empty rows, including an empty row after a non-empty last row
+    rng = np.random.default_rng(1)
+    nnz_per_row = [0, 3, 0, 0, 5, 1, 0, 4, 0, 0]
+    dense = np.zeros((len(nnz_per_row), N_FEATURES))
+    for i, nnz in enumerate(nnz_per_row):
+        columns = rng.choice(N_FEATURES, size=nnz, replace=False)
+        dense[i, columns] = rng.uniform(0.1, 1.0, size=nnz)
+    return sp.csr_matrix(dense)
+
+
+@pytest.mark.parametrize('weight_dtype', ['int8', 'float32'])
+@pytest.mark.parametrize('pruned', [False, True])
+def test_gather_and_matmul_paths_agree(monkeypatch, weight_dtype, pruned):
+    compact = make_scorer(weight_dtype, pruned)
+    X = make_batch()
+    expected = X.toarray() @ compact.dense_coef() + compact.intercept
+
+    monkeypatch.setattr(scorer, 'GATHER_RATIO', 0)
+    gathered = compact.decision_matrix(X)
+    monkeypatch.setattr(scorer, 'GATHER_RATIO', 10 ** 9)
+    multiplied = compact.decision_matrix(X)
+
+    np.testing.assert_allclose(gathered, expected, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(multiplied, expected, rtol=1e-5, atol=1e-6)
+    empty = X.getnnz(axis=1) == 0
+    np.testing.assert_array_equal(gathered[empty], np.broadcast_to(compact.intercept, gathered[empty].shape))
+
+
+def test_all_empty_batch_scores_intercept():
+    compact = make_scorer('int8', pruned=True)
+    X = sp.csr_matrix((4, N_FEATURES))
+    np.testing.assert_array_equal(compact.decision_matrix(X), np.tile(compact.intercept, (4, 1)))
+
+
+def fit_calibrated_svm():
+    pytest.importorskip('sklearn')
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.svm import LinearSVC
+
+    rng = np.random.default_rng(2)
+    X = sp.random(300, N_FEATURES, density=0.05, format='csr', random_state=3)
+    y = (X @ rng.normal(size=N_FEATURES) + rng.normal(scale=0.1, size=300) > 0).astype(int)
+    model = CalibratedClassifierCV(LinearSVC(), cv=3, method='sigmoid').fit(X, y)
+    return model, make_batch()
+
+
+def test_compiled_scorer_matches_calibrated_svm():
+    model, X = fit_calibrated_svm()
+    compiled = CompiledLinearScorer.from_model(model)
+    assert compiled is not None and compiled.n_folds == 3
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=DEFAULT_TOLERANCE)
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+
+
+def test_compile_model_uses_compiled_scorer():
+    model, X = fit_calibrated_svm()
+    compiled = compile_model(model)
+    assert isinstance(compiled, CompiledLinearScorer)
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), rtol=0, atol=DEFAULT_TOLERANCE)
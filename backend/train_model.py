@@ -1,25 +1,50 @@
 """
 Model Training Script for Restaurant Sentiment Analysis
 Uses LinearSVC (no Naive Bayes) with TF-IDF vectorization and probability calibration.
+
+With --incremental NEW.csv, only the new reviews are read: the registry's active
+version is updated from them (partial_fit for streaming SGD models, a refit on a
+bounded replay buffer plus the new rows otherwise) and published as a new version
+with before/after metrics on the same holdout rows.
+
+With --compact, the mapped artifacts (--artifact-dir, --registry) hold a pruned,
+quantized copy of the model (quantize.py), checked against the full model on the
+test split; the pickles keep the full model.
 """
 
 import os
+import time
 import pickle
 import logging
+import argparse
+import tempfile
+import contextlib
 
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
 from sklearn.svm import LinearSVC
 from sklearn.calibration import CalibratedClassifierCV
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
 
-from preprocess import preprocess_text
+from preprocess import preprocess_many, create_preprocess_pool
+from corpus_cache import PreprocessedCorpusCache
+from artifacts import save_artifact
+from quantize import (compact_model, measure_drift, check_drift, WEIGHT_DTYPES, DEFAULT_PRUNE_THRESHOLD,
+                      DEFAULT_MAX_ACCURACY_DROP, DEFAULT_MAX_PROBA_DRIFT)
+from features import HashedNgramFeaturizer, DEFAULT_N_FEATURES
+from estimators import TimedLinearSVC
+from registry import ModelRegistry, MODEL_FILE, VECTORIZER_FILE, REPLAY_FILE
 
 # Configuration
 DATA_PATH = 'data/Yelp Restaurant Reviews.csv'
 MODEL_PATH = 'sentiment_model.pkl'
 VECTORIZER_PATH = 'vectorizer.pkl'
+PREPROCESS_CACHE_DIR = 'data/preprocessed_cache'
+REPLAY_SIZE = 50000
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
 logger = logging.getLogger('train_model')
@@ -35,33 +60,108 @@ def load_dataset(filepath):
     return df
 
 
-def create_sentiment_labels(df, rating_col='stars'):
-    logger.info(f"Creating sentiment labels from '{rating_col}' column...")
+def label_sentiment(df, rating_col='stars'):
     df = df.copy()
     df['sentiment'] = df[rating_col].apply(lambda x: 1 if x >= 4 else (0 if x <= 2 else None))
     df_filtered = df[df['sentiment'].notna()].copy()
     df_filtered['sentiment'] = df_filtered['sentiment'].astype(int)
+    return df_filtered
+
+
+def create_sentiment_labels(df, rating_col='stars'):
+    logger.info(f"Creating sentiment labels from '{rating_col}' column...")
+    df_filtered = label_sentiment(df, rating_col)
     logger.info(f"Dataset after removing neutral reviews: {df_filtered.shape}")
     logger.info(f"Sentiment distribution:\n{df_filtered['sentiment'].value_counts().to_dict()}")
     return df_filtered
 
 
-def preprocess_dataset(df, text_col='text'):
-    logger.info("Preprocessing text data...")
-    texts = df[text_col].astype(str).apply(preprocess_text).tolist()
+class ProgressReporter:
+    def __init__(self, label, interval=5.0):
+        self.label = label
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    def __call__(self, done, total):
+        now = time.perf_counter()
+        if done < total and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        elapsed = now - self.start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        logger.info(f"{self.label}: {done}/{total} rows ({rate:,.0f} rows/s)")
+
+
+def preprocess_dataset(df, text_col='text', workers=1, chunk_size=10000, cache_dir=None):
+    logger.info(f"Preprocessing text data with {workers} worker(s)...")
+    raw_texts = df[text_col].astype(str).tolist()
+    progress = ProgressReporter('Preprocessing')
+    if cache_dir:
+        cache = PreprocessedCorpusCache(cache_dir)
+        texts = cache.preprocess(raw_texts, workers=workers, chunk_size=chunk_size, progress=progress)
+        logger.info(f"Preprocessing cache {cache.directory}: {cache.hits} rows reused, "
+                    f"{cache.misses} preprocessed")
+    else:
+        texts = preprocess_many(raw_texts, workers=workers, chunk_size=chunk_size, progress=progress)
     labels = df['sentiment'].tolist()
     return texts, labels
 
 
-def build_and_train_model(X_train_texts, y_train, max_features=5000):
-    logger.info("Vectorizing text with TF-IDF...")
-    vectorizer = TfidfVectorizer(max_features=max_features, ngram_range=(1, 2), stop_words='english')
+def build_vectorizer(max_features=5000, ngram_range=(1, 2), **params):
+    return TfidfVectorizer(max_features=max_features, ngram_range=tuple(ngram_range),
+                           stop_words='english', **params)
+
+
+def build_featurizer(n_features=DEFAULT_N_FEATURES, ngram_range=(1, 2), **params):
+    # Vocabulary-free alternative to build_vectorizer; stopwords are already removed by preprocessing
+    return HashedNgramFeaturizer(n_features=n_features, ngram_range=tuple(ngram_range), **params)
+
+
+def build_classifier(C=1.0, cv=5, max_iter=10000, n_jobs=None, **params):
+    # Calibration folds are fitted in parallel on n_jobs cores. Folds (StratifiedKFold
+    # without shuffling) and the LinearSVC random_state are fixed, so the fitted model
+    # is identical for any n_jobs.
+    base_clf = TimedLinearSVC(C=C, class_weight='balanced', max_iter=max_iter, random_state=42, **params)
+    return CalibratedClassifierCV(base_clf, cv=cv, n_jobs=n_jobs)  # enables predict_proba
+
+
+def collect_fold_stats(clf):
+    # Per-fold fit time and liblinear iteration count of a fitted calibrated model. Removes
+    # the timing attributes so the pickle is deterministic, and replaces the unfitted
+    # TimedLinearSVC template with a plain LinearSVC of the same parameters.
+    clf.estimator = LinearSVC(**clf.estimator.get_params())
+    stats = []
+    for i, calibrated in enumerate(clf.calibrated_classifiers_):
+        svc = calibrated.estimator
+        n_iter = int(np.max(svc.n_iter_))
+        stats.append({
+            'fold': i,
+            'fit_seconds': svc.__dict__.pop('fit_seconds_', None),
+            'n_iter': n_iter,
+            'converged': n_iter < svc.max_iter,
+        })
+    return stats
+
+
+def build_and_train_model(X_train_texts, y_train, max_features=5000, features='tfidf', n_features=DEFAULT_N_FEATURES,
+                          n_jobs=None):
+    if features == 'hashed':
+        logger.info(f"Vectorizing text with hashed TF-IDF ({n_features} features)...")
+        vectorizer = build_featurizer(n_features=n_features)
+    else:
+        logger.info("Vectorizing text with TF-IDF...")
+        vectorizer = build_vectorizer(max_features=max_features)
     X_train = vectorizer.fit_transform(X_train_texts)
-    logger.info("Training LinearSVC model and calibrating probabilities...")
-    base_clf = LinearSVC(class_weight='balanced', max_iter=10000, random_state=42)
-    clf = CalibratedClassifierCV(base_clf, cv=5)  # enables predict_proba
+    logger.info(f"Training LinearSVC model and calibrating probabilities (n_jobs={n_jobs})...")
+    clf = build_classifier(n_jobs=n_jobs)
+    start = time.perf_counter()
     clf.fit(X_train, y_train)
-    logger.info("Training complete.")
+    elapsed = time.perf_counter() - start
+    for fold in collect_fold_stats(clf):
+        logger.info(f"Fold {fold['fold']}: fit {fold['fit_seconds']:.2f}s, {fold['n_iter']} iterations"
+                    + ("" if fold['converged'] else " (did not converge, raise max_iter)"))
+    logger.info(f"Training complete in {elapsed:.2f}s.")
     return vectorizer, clf
 
 
@@ -78,23 +178,406 @@ def evaluate_model(vectorizer, model, X_test_texts, y_test):
     return {'accuracy': acc, 'precision': prec, 'recall': rec, 'f1': f1}
 
 
-def save_model_and_vectorizer(model, vectorizer, model_path, vectorizer_path):
+def build_compact_model(model, vectorizer, texts, labels, threshold=DEFAULT_PRUNE_THRESHOLD, weight_dtype='int8',
+                        max_accuracy_drop=DEFAULT_MAX_ACCURACY_DROP, max_proba_drift=DEFAULT_MAX_PROBA_DRIFT):
+    # Prunes and quantizes the model, then compares it with the full model on the test rows.
+    # Returns (scorer, vectorizer, stats) to write as the mapped artifact, or None (the full
+    # model is then written) if the model cannot be compacted or drifts past the bounds.
+    logger.info(f"Pruning weights below {threshold} and quantizing to {weight_dtype}...")
+    try:
+        scorer, compact_vectorizer, stats = compact_model(model, vectorizer, threshold, weight_dtype)
+        stats.update(measure_drift(model, vectorizer, scorer, compact_vectorizer, texts, labels))
+        logger.info(f"Kept {stats['kept_features']}/{stats['features']} features, weights "
+                    f"{stats['weight_bytes'] / 1e6:.2f} MB -> {stats['kept_weight_bytes'] / 1e6:.2f} MB; "
+                    f"accuracy {stats['accuracy']:.4f} -> {stats['compact_accuracy']:.4f}, "
+                    f"probability drift max {stats['max_proba_drift']:.4f} mean {stats['mean_proba_drift']:.4f}")
+        check_drift(stats, max_accuracy_drop, max_proba_drift)
+    except ValueError as e:
+        logger.warning(f"Writing the full model instead of a compact one: {e}")
+        return None
+    return scorer, compact_vectorizer, stats
+
+
+def save_model_and_vectorizer(model, vectorizer, model_path, vectorizer_path, artifact_dir=None, compact=None):
+    # compact is a (scorer, vectorizer, stats) triple from build_compact_model, written as the
+    # mapped artifact instead of the full model.
     logger.info(f"Saving model to {model_path} and vectorizer to {vectorizer_path}...")
     with open(model_path, 'wb') as f:
         pickle.dump(model, f)
     with open(vectorizer_path, 'wb') as f:
         pickle.dump(vectorizer, f)
     logger.info("Saved model and vectorizer.")
+    if artifact_dir:
+        manifest = save_mapped_artifact(model, vectorizer, artifact_dir, compact)
+        logger.info(f"Saved mapped artifact to {artifact_dir} (checksum {manifest['checksum'][:12]}).")
+
+
+def save_mapped_artifact(model, vectorizer, directory, compact=None):
+    # Writes the compact model when one is given, the full model otherwise.
+    if compact is not None:
+        scorer, compact_vectorizer, stats = compact
+        return save_artifact(scorer, compact_vectorizer, directory, compression=stats)
+    return save_artifact(model, vectorizer, directory)
+
+
+def publish_to_registry(model, vectorizer, registry_dir, metrics=None, activate=False, replay=None, info=None,
+                        compact=None):
+    # Saves the model as a new registry version (pickles, plus a mapped artifact when the
+    # model supports it) so a running server can hot-reload it via /admin/reload.
+    # replay is a (train, holdout) pair of (texts, labels) kept for incremental updates;
+    # info holds extra JSON fields stored with the metrics; compact replaces the mapped
+    # artifact as in save_model_and_vectorizer.
+    registry = ModelRegistry(registry_dir)
+    version, directory = registry.create_version()
+    save_model_and_vectorizer(model, vectorizer, os.path.join(directory, MODEL_FILE),
+                              os.path.join(directory, VECTORIZER_FILE))
+    try:
+        save_mapped_artifact(model, vectorizer, directory, compact)
+    except ValueError as e:
+        logger.info(f"No mapped artifact for this version: {e}")
+    if replay is not None:
+        save_replay_buffer(directory, *replay)
+    registry.write_metrics(version, {**{key: float(value) for key, value in (metrics or {}).items()},
+                                     **(info or {})})
+    if activate:
+        registry.set_active(version)
+    logger.info(f"Published model version {version} to {registry_dir}" + (" (active)" if activate else ""))
+    return version
+
+
+def sample_rows(texts, labels, max_rows, seed=42):
+    # Uniform random sample of at most max_rows (text, label) pairs, in their original order.
+    if len(texts) <= max_rows:
+        return list(texts), [int(label) for label in labels]
+    keep = np.sort(np.random.RandomState(seed).choice(len(texts), max_rows, replace=False))
+    return [texts[i] for i in keep], [int(labels[i]) for i in keep]
+
+
+def merge_rows(old, old_total, new, max_rows, seed=42):
+    # Merges a stored sample standing for old_total rows with new (texts, labels), so the
+    # result stays a uniform sample of everything seen: each side contributes in proportion
+    # to the number of rows it stands for.
+    total = old_total + len(new[0])
+    n_new = min(len(new[0]), int(round(max_rows * len(new[0]) / total))) if total else 0
+    old_texts, old_labels = sample_rows(*old, max_rows - n_new, seed=seed)
+    new_texts, new_labels = sample_rows(*new, n_new, seed=seed)
+    return old_texts + new_texts, old_labels + new_labels
+
+
+def save_replay_buffer(directory, train, holdout):
+    # Preprocessed texts are stored, so incremental updates never preprocess old rows again.
+    frames = [pd.DataFrame({'processed': list(texts), 'sentiment': np.asarray(labels, dtype=np.int8),
+                            'holdout': is_holdout_part})
+              for (texts, labels), is_holdout_part in ((train, False), (holdout, True))]
+    pd.concat(frames, ignore_index=True).to_parquet(os.path.join(directory, REPLAY_FILE), index=False)
+
+
+def load_replay_buffer(directory):
+    # Returns (train, holdout) pairs of (texts, labels); empty for versions without a buffer.
+    path = os.path.join(directory, REPLAY_FILE)
+    if not os.path.exists(path):
+        return ([], []), ([], [])
+    df = pd.read_parquet(path)
+    parts = []
+    for is_holdout_part in (False, True):
+        part = df[df['holdout'] == is_holdout_part]
+        parts.append((part['processed'].tolist(), part['sentiment'].astype(int).tolist()))
+    return tuple(parts)
 
 
-def main():
+def load_base_version(registry, version=None):
+    # Pickled model and vectorizer, replay buffer and stored metrics of a registry version
+    # (the active one by default).
+    version = version or registry.active_version()
+    if version is None:
+        raise KeyError(f"No active model version in {registry.root}; pass --base-version")
+    directory = registry.version_dir(version)
+    model_path, vectorizer_path = os.path.join(directory, MODEL_FILE), os.path.join(directory, VECTORIZER_FILE)
+    if not os.path.exists(model_path) or not os.path.exists(vectorizer_path):
+        raise FileNotFoundError(f"Version {version} has no pickled model to update")
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(vectorizer_path, 'rb') as f:
+        vectorizer = pickle.load(f)
+    return version, model, vectorizer, load_replay_buffer(directory), registry.read_metrics(version)
+
+
+def update_model(model, vectorizer, texts, labels, replay=([], []), epochs=1, n_jobs=None):
+    # Updates a trained model with new preprocessed rows, in time proportional to the new rows
+    # plus the bounded replay buffer. Returns (vectorizer, model, method).
+    #   hashed features: document frequencies are counts, so the IDF absorbs the new rows.
+    #   TfidfVectorizer / streaming pipeline: vocabulary and IDF stay as trained.
+    #   SGD models: partial_fit on the new rows.
+    #   Calibrated LinearSVC (no partial_fit): refit on replay buffer + new rows with the
+    #   base model's hyperparameters.
+    if isinstance(vectorizer, HashedNgramFeaturizer):
+        vectorizer.partial_fit([text.split() for text in texts])
+    if hasattr(model, 'partial_fit'):
+        X = vectorizer.transform(texts)
+        for _ in range(epochs):
+            model.partial_fit(X, labels)
+        return vectorizer, model, 'partial_fit'
+    replay_texts, replay_labels = replay
+    logger.info(f"Refitting on {len(replay_texts)} replay + {len(texts)} new rows...")
+    base_svc = model.estimator
+    clf = build_classifier(C=base_svc.C, cv=model.cv, max_iter=base_svc.max_iter, n_jobs=n_jobs)
+    clf.fit(vectorizer.transform(list(replay_texts) + list(texts)), list(replay_labels) + list(labels))
+    collect_fold_stats(clf)
+    return vectorizer, clf, 'replay_refit'
+
+
+def iter_dataset_chunks(filepath, text_col, rating_col, chunksize):
+    # Yields (row_positions, texts, labels) for each CSV chunk, neutral reviews removed.
+    # row_positions are positions in the raw CSV, used for a stable holdout split.
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Dataset not found at {filepath}")
+    offset = 0
+    for chunk in pd.read_csv(filepath, usecols=[text_col, rating_col], chunksize=chunksize):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        labeled = label_sentiment(chunk, rating_col)
+        yield labeled.index.to_numpy(), labeled[text_col].astype(str).tolist(), labeled['sentiment'].to_numpy()
+
+
+def is_holdout(row_positions, holdout_percent):
+    # Deterministic holdout split: holdout_percent out of every 100 CSV rows.
+    return (row_positions % 100) < holdout_percent
+
+
+def build_hashing_vectorizer(n_features):
+    return HashingVectorizer(n_features=n_features, ngram_range=(1, 2), stop_words='english',
+                             alternate_sign=False, norm=None)
+
+
+def train_streaming(filepath, text_col, rating_col, chunksize=50000, n_features=2 ** 20,
+                    holdout_percent=20, holdout_max_rows=100000, epochs=1, workers=1, chunk_size=10000):
+    # Out-of-core training with memory independent of dataset size:
+    #   pass 1 reads the CSV once, preprocesses each chunk on one shared, warmed-up process
+    #   pool, counts hashed document frequencies (stateless vocabulary) and class totals,
+    #   and spills the preprocessed chunk to a temporary Parquet file;
+    #   pass 2 feeds TF-IDF chunks of the spilled rows to SGDClassifier.partial_fit, so
+    #   later epochs never preprocess a row again.
+    # A bounded sample of holdout rows is kept in memory for evaluation.
+    hasher = build_hashing_vectorizer(n_features)
+
+    with tempfile.TemporaryDirectory(prefix='streaming-') as spill_dir:
+        logger.info("Streaming pass 1: preprocessing and document frequencies...")
+        doc_freq = np.zeros(n_features, dtype=np.int64)
+        class_counts = np.zeros(2, dtype=np.int64)
+        n_docs = 0
+        spilled = []
+        pool = create_preprocess_pool(workers) if workers > 1 else contextlib.nullcontext()
+        with pool as executor:
+            chunks = iter_dataset_chunks(filepath, text_col, rating_col, chunksize)
+            for i, (positions, raw_texts, labels) in enumerate(chunks):
+                texts = preprocess_many(raw_texts, chunk_size=chunk_size, executor=executor)
+                holdout_mask = is_holdout(positions, holdout_percent)
+                counts = hasher.transform([t for t, h in zip(texts, holdout_mask) if not h])
+                doc_freq += np.bincount(counts.indices, minlength=n_features)
+                class_counts += np.bincount(labels[~holdout_mask], minlength=2)
+                n_docs += counts.shape[0]
+                path = os.path.join(spill_dir, f'chunk-{i:05d}.parquet')
+                pd.DataFrame({'processed': texts, 'sentiment': labels.astype(np.int8),
+                              'holdout': holdout_mask}).to_parquet(path, index=False)
+                spilled.append(path)
+                logger.info(f"Pass 1: {n_docs} training rows counted")
+        if n_docs == 0:
+            raise ValueError("No labeled training rows found in dataset")
+
+        tfidf = TfidfTransformer()
+        tfidf.idf_ = np.log((1 + n_docs) / (1 + doc_freq)) + 1.0
+        tfidf.n_features_in_ = n_features
+        vectorizer = Pipeline([('hash', hasher), ('tfidf', tfidf)])
+
+        # Equivalent of class_weight='balanced', which partial_fit cannot compute itself
+        class_weight = {c: n_docs / (2.0 * max(class_counts[c], 1)) for c in (0, 1)}
+        clf = SGDClassifier(loss='log_loss', alpha=1e-5, class_weight=class_weight, random_state=42)
+
+        holdout_texts, holdout_labels = [], []
+        for epoch in range(epochs):
+            logger.info(f"Streaming pass 2: SGD epoch {epoch + 1}/{epochs}...")
+            seen = 0
+            for path in spilled:
+                chunk = pd.read_parquet(path)
+                texts, labels = chunk['processed'].tolist(), chunk['sentiment'].to_numpy()
+                holdout_mask = chunk['holdout'].to_numpy()
+                train_idx = np.flatnonzero(~holdout_mask)
+                if len(train_idx):
+                    X = vectorizer.transform([texts[i] for i in train_idx])
+                    clf.partial_fit(X, labels[train_idx], classes=np.array([0, 1]))
+                    seen += len(train_idx)
+                if epoch == 0:
+                    room = holdout_max_rows - len(holdout_texts)
+                    for i in np.flatnonzero(holdout_mask)[:max(room, 0)]:
+                        holdout_texts.append(texts[i])
+                        holdout_labels.append(int(labels[i]))
+                logger.info(f"Epoch {epoch + 1}: {seen}/{n_docs} training rows fitted")
+
+    logger.info("Streaming training complete.")
+    return vectorizer, clf, holdout_texts, holdout_labels
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {text}")
+    return value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Train the restaurant review sentiment model.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes used for text preprocessing (default: 1)')
+    parser.add_argument('--chunk-size', type=positive_int, default=10000,
+                        help='Number of reviews sent to a preprocessing worker at a time')
+    parser.add_argument('--cache-dir', default=PREPROCESS_CACHE_DIR,
+                        help='Directory of the preprocessed-corpus cache (default: %(default)s)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Preprocess every review from scratch without reading or writing the cache')
+    parser.add_argument('--jobs', type=int, default=-1,
+                        help='Cores used to fit the calibration folds in parallel (default: all)')
+    parser.add_argument('--features', choices=['tfidf', 'hashed'], default='tfidf',
+                        help='tfidf: vocabulary-based TfidfVectorizer; hashed: hashed uni+bigrams over '
+                             'preprocessing tokens (features.py)')
+    parser.add_argument('--artifact-dir',
+                        help='Also write a memory-mapped, pickle-free artifact to this directory')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Out-of-core training: read the CSV in chunks and fit an incremental model '
+                             '(not combined with --artifact-dir or --compact)')
+    parser.add_argument('--csv-chunk-size', type=positive_int, default=50000,
+                        help='Rows read from the CSV at a time in streaming mode')
+    parser.add_argument('--n-features', type=int,
+                        help='Width of the hashed feature space in streaming mode (default: 2**20) '
+                             f'and with --features hashed (default: {DEFAULT_N_FEATURES})')
+    parser.add_argument('--epochs', type=int, default=1,
+                        help='Passes of SGD over the dataset in streaming mode')
+    parser.add_argument('--holdout-max-rows', type=int, default=100000,
+                        help='Maximum holdout rows kept in memory for evaluation in streaming mode')
+    parser.add_argument('--registry',
+                        help='Also publish the model as a new version in this model registry directory')
+    parser.add_argument('--activate', action='store_true',
+                        help='Point the registry ACTIVE file at the new version (servers watching it reload)')
+    parser.add_argument('--replay-size', type=int, default=REPLAY_SIZE,
+                        help='Training rows sampled into the registry replay buffer for incremental updates')
+    parser.add_argument('--incremental', metavar='NEW_CSV',
+                        help='Update the registry model from only the new reviews in this CSV (needs --registry)')
+    parser.add_argument('--base-version',
+                        help='Registry version updated by --incremental (default: the active version)')
+    parser.add_argument('--compact', action='store_true',
+                        help='Write pruned, quantized weights to the mapped artifacts (--artifact-dir, --registry), '
+                             'if they stay within the drift bounds on the test split')
+    parser.add_argument('--prune-threshold', type=float, default=DEFAULT_PRUNE_THRESHOLD,
+                        help='Prune features whose log-odds weight is below this in every fold (default: %(default)s)')
+    parser.add_argument('--weight-dtype', choices=WEIGHT_DTYPES, default='int8',
+                        help='Storage type of the kept weights; int8 uses one scale per fold (default: %(default)s)')
+    parser.add_argument('--max-accuracy-drop', type=float, default=DEFAULT_MAX_ACCURACY_DROP,
+                        help='Largest test accuracy decrease accepted for --compact (default: %(default)s)')
+    parser.add_argument('--max-proba-drift', type=float, default=DEFAULT_MAX_PROBA_DRIFT,
+                        help='Largest change of a test probability accepted for --compact (default: %(default)s)')
+    args = parser.parse_args(argv)
+    # The streaming model scores through a HashingVectorizer pipeline, which has no mapped artifact format
+    if args.streaming and not args.incremental:
+        for flag, value in (('--artifact-dir', args.artifact_dir), ('--compact', args.compact)):
+            if value:
+                parser.error(f"{flag} is not supported with --streaming")
+    return args
+
+
+def compact_from_args(args, model, vectorizer, texts, labels):
+    if not args.compact:
+        return None
+    return build_compact_model(model, vectorizer, texts, labels, threshold=args.prune_threshold,
+                               weight_dtype=args.weight_dtype, max_accuracy_drop=args.max_accuracy_drop,
+                               max_proba_drift=args.max_proba_drift)
+
+
+def main_streaming(args):
+    vectorizer, model, X_test, y_test = train_streaming(
+        DATA_PATH, text_col='Review Text', rating_col='Rating', chunksize=args.csv_chunk_size,
+        n_features=args.n_features or 2 ** 20, holdout_max_rows=args.holdout_max_rows, epochs=args.epochs,
+        workers=args.workers, chunk_size=args.chunk_size)
+    metrics = evaluate_model(vectorizer, model, X_test, y_test) if X_test else None
+    save_model_and_vectorizer(model, vectorizer, MODEL_PATH, VECTORIZER_PATH)
+    if args.registry:
+        # SGD updates use partial_fit, so only the holdout rows are kept for incremental updates
+        publish_to_registry(model, vectorizer, args.registry, metrics, activate=args.activate,
+                            replay=(([], []), (X_test, y_test)), info={'holdout_rows': len(X_test)})
+    logger.info("Streaming training pipeline finished.")
+
+
+def main_incremental(args):
+    if not args.registry:
+        raise SystemExit("--incremental needs --registry to read the base model from")
+    registry = ModelRegistry(args.registry)
+    base_version, model, vectorizer, (replay, holdout), base_info = load_base_version(registry, args.base_version)
+    logger.info(f"Updating model version {base_version} ({len(replay[0])} replay rows, "
+                f"{len(holdout[0])} holdout rows stored)...")
+
+    df_new = create_sentiment_labels(load_dataset(args.incremental), rating_col='Rating')
+    texts, labels = preprocess_dataset(df_new, text_col='Review Text',
+                                       workers=args.workers, chunk_size=args.chunk_size,
+                                       cache_dir=None if args.no_cache else args.cache_dir)
+    # Same 80/20 proportion as a full training run, stable across reruns on the same file
+    holdout_mask = is_holdout(df_new.index.to_numpy(), 20)
+    new_train = ([t for t, h in zip(texts, holdout_mask) if not h], [y for y, h in zip(labels, holdout_mask) if not h])
+    new_holdout = ([t for t, h in zip(texts, holdout_mask) if h], [y for y, h in zip(labels, holdout_mask) if h])
+
+    # Before and after are scored on the same rows: the stored holdout plus the new holdout rows
+    eval_texts, eval_labels = holdout[0] + new_holdout[0], holdout[1] + new_holdout[1]
+    before = evaluate_model(vectorizer, model, eval_texts, eval_labels) if eval_texts else None
+    start = time.perf_counter()
+    vectorizer, model, method = update_model(model, vectorizer, *new_train, replay=replay,
+                                             epochs=args.epochs, n_jobs=args.jobs)
+    update_seconds = time.perf_counter() - start
+    logger.info(f"Updated with {method} on {len(new_train[0])} new rows in {update_seconds:.2f}s.")
+    after = evaluate_model(vectorizer, model, eval_texts, eval_labels) if eval_texts else None
+    if before and after:
+        logger.info(f"Holdout accuracy {before['accuracy']:.4f} -> {after['accuracy']:.4f}, "
+                    f"F1 {before['f1']:.4f} -> {after['f1']:.4f}")
+        if after['f1'] < before['f1']:
+            logger.warning("The update scores worse than its base version on the holdout rows")
+
+    training_rows = int(base_info.get('training_rows', len(replay[0])))
+    holdout_rows = int(base_info.get('holdout_rows', len(holdout[0])))
+    replay = (merge_rows(replay, training_rows, new_train, args.replay_size),
+              merge_rows(holdout, holdout_rows, new_holdout, args.holdout_max_rows))
+    info = {
+        'base_version': base_version,
+        'base_metrics': {key: float(value) for key, value in before.items()} if before else None,
+        'update_method': method,
+        'update_seconds': round(update_seconds, 3),
+        'new_rows': len(texts),
+        'training_rows': training_rows + len(new_train[0]),
+        'holdout_rows': holdout_rows + len(new_holdout[0]),
+    }
+    compact = compact_from_args(args, model, vectorizer, eval_texts, eval_labels) if eval_texts else None
+    publish_to_registry(model, vectorizer, args.registry, after, activate=args.activate, replay=replay, info=info,
+                        compact=compact)
+    logger.info("Incremental update finished.")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.incremental:
+        return main_incremental(args)
+    if args.streaming:
+        return main_streaming(args)
     df = load_dataset(DATA_PATH)
     df_filtered = create_sentiment_labels(df, rating_col='Rating')
-    texts, labels = preprocess_dataset(df_filtered, text_col='Review Text')
+    texts, labels = preprocess_dataset(df_filtered, text_col='Review Text',
+                                       workers=args.workers, chunk_size=args.chunk_size,
+                                       cache_dir=None if args.no_cache else args.cache_dir)
     X_train, X_test, y_train, y_test = train_test_split(texts, labels, test_size=0.2, random_state=42, stratify=labels)
-    vectorizer, model = build_and_train_model(X_train, y_train)
+    vectorizer, model = build_and_train_model(X_train, y_train, features=args.features,
+                                              n_features=args.n_features or DEFAULT_N_FEATURES, n_jobs=args.jobs)
     metrics = evaluate_model(vectorizer, model, X_test, y_test)
-    save_model_and_vectorizer(model, vectorizer, MODEL_PATH, VECTORIZER_PATH)
+    compact = compact_from_args(args, model, vectorizer, X_test, y_test)
+    save_model_and_vectorizer(model, vectorizer, MODEL_PATH, VECTORIZER_PATH, artifact_dir=args.artifact_dir,
+                              compact=compact)
+    if args.registry:
+        replay = (sample_rows(X_train, y_train, args.replay_size), sample_rows(X_test, y_test, args.holdout_max_rows))
+        publish_to_registry(model, vectorizer, args.registry, metrics, activate=args.activate, replay=replay,
+                            info={'training_rows': len(X_train), 'holdout_rows': len(X_test)}, compact=compact)
     logger.info("Training pipeline finished.")
 
 
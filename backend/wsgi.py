@@ -0,0 +1,15 @@
+"""
+WSGI Entry Point
+================
+Exposes the loaded, warmed-up Flask app for WSGI servers, e.g.:
+
+    gunicorn --preload --workers 4 --threads 8 wsgi:app
+
+Use serve.py for the bundled pre-fork server. With one process per
+container (no --preload), BACKGROUND_WARMUP=1 makes the app answer /health
+while the model loads and warms up.
+"""
+
+from app import create_app
+
+app = create_app()